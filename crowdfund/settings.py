@@ -38,8 +38,12 @@ TEMPLATES = [
     },
 ]
 MIDDLEWARE = [
+    'projects.middleware.ServerTimingMiddleware',  # ← Server-Timing и выборочный cProfile (должен быть первым)
+    'projects.middleware.MetricsMiddleware',  # ← Длительность запросов для /metrics
     'django.middleware.security.SecurityMiddleware',
+    'projects.middleware.QueryCountMiddleware',  # ← Счётчик запросов к БД и поиск N+1 (QUERY_TRACKING)
     'django.contrib.sessions.middleware.SessionMiddleware',  # ← Нужен для сессий
+    'projects.middleware.CurrentUserMiddleware',  # ← request.current_user (один запрос к users на запрос)
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware', \
@@ -50,10 +54,67 @@ MIDDLEWARE = [
 ROOT_URLCONF = 'crowdfund.urls'
 WSGI_APPLICATION = 'crowdfund.wsgi.application'
 
-# 🔥 КРИТИЧЕСКИ ВАЖНО: Настраиваем ФАЙЛОВЫЕ сессии вместо базы данных
-SESSION_ENGINE = 'django.contrib.sessions.backends.file'
-SESSION_FILE_PATH = os.path.join(BASE_DIR, 'sessions')  # Папка для хранения сессий
+# Сессии хранятся в UNLOGGED-таблице PostgreSQL (projects/session_store.py)
+SESSION_ENGINE = 'projects.session_store'
 SESSION_COOKIE_AGE = 1209600  # 2 недели
+SESSION_CACHE_SIZE = int(os.getenv('SESSION_CACHE_SIZE', '10000'))  # Процессный кэш прочитанных сессий
+SESSION_CACHE_TTL = float(os.getenv('SESSION_CACHE_TTL', '5'))  # секунд
+SESSION_SWEEP_INTERVAL = int(os.getenv('SESSION_SWEEP_INTERVAL', '3600'))  # Очистка просроченных, 0 — только clearsessions
+
+# Учёт запросов к БД на HTTP-запрос (projects.middleware.QueryCountMiddleware)
+QUERY_TRACKING = os.getenv('QUERY_TRACKING', str(DEBUG)) == 'True'
+QUERY_REPEAT_THRESHOLD = int(os.getenv('QUERY_REPEAT_THRESHOLD', '5'))  # Повторов одного запроса до предупреждения о N+1
+
+# Профилирование запросов (projects.middleware.ServerTimingMiddleware)
+SERVER_TIMING = os.getenv('SERVER_TIMING', str(DEBUG)) == 'True'
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))  # Доля запросов под cProfile, 0 — выключено
+PROFILE_THRESHOLD_MS = float(os.getenv('PROFILE_THRESHOLD_MS', '500'))  # Сохранять профили запросов дольше порога
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(BASE_DIR, 'profiles'))
+
+# Метрики Prometheus: GET /metrics (projects/metrics.py)
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+METRICS_ALLOWED_IPS = os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+
+# Логи приложения: JSON в stdout из фонового потока (projects/logs.py)
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'DEBUG' if DEBUG else 'INFO')
+LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', '1'))  # Доля записей ниже WARNING, которые попадают в лог
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))  # Записей в очереди; сверх неё — отбрасываются
+
+# Фоновые задачи (projects/jobs.py, manage.py run_jobs)
+JOB_CONCURRENCY = int(os.getenv('JOB_CONCURRENCY', '2'))  # Потоков воркера по умолчанию
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '5'))  # Попыток до переноса задачи в dead
+JOB_RETRY_BASE = float(os.getenv('JOB_RETRY_BASE', '10'))  # Задержка первого повтора, секунд; дальше удваивается
+JOB_RETRY_MAX = float(os.getenv('JOB_RETRY_MAX', '3600'))  # Предел задержки повтора, секунд
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '5'))  # Опрос очереди без NOTIFY, секунд
+JOB_LOCK_TIMEOUT = int(os.getenv('JOB_LOCK_TIMEOUT', '600'))  # Через сколько секунд задача упавшего воркера возвращается
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'sampling': {
+            '()': 'projects.logs.SamplingFilter',
+            'rate': LOG_SAMPLE_RATE,
+        },
+    },
+    'handlers': {
+        'background': {
+            '()': 'projects.logs.BackgroundHandler',
+            'queue_size': LOG_QUEUE_SIZE,
+            'filters': ['sampling'],
+        },
+    },
+    'loggers': {
+        'projects': {
+            'handlers': ['background'],
+            'level': LOG_LEVEL,
+            'propagate': False,
+        },
+    },
+}
+
+# Папка прежнего файлового движка: нужна для переноса сессий (manage.py import_file_sessions)
+SESSION_FILE_PATH = os.path.join(BASE_DIR, 'sessions')
 
 # Полностью отключаем ORM Django
 DATABASES = {
@@ -64,8 +125,18 @@ DATABASES = {
 
 # Статика и медиа
 STATIC_URL = '/static/'
-STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+# Сборка manage.py build_static (варианты картинок, WOFF2); стоит первой, чтобы
+# её файлы перекрывали исходники с тем же именем
+ASSETS_DIR = os.getenv('ASSETS_DIR', os.path.join(BASE_DIR, 'assets'))
+STATICFILES_DIRS = [ASSETS_DIR, os.path.join(BASE_DIR, 'static')]
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+SERVE_STATIC = os.getenv('SERVE_STATIC', 'False') == 'True'  # Отдавать STATIC_ROOT из Django, если перед ним нет nginx
+
+# Имена статики с хешем содержимого (art.0123456789ab.png) — их можно кэшировать навсегда
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.ManifestStaticFilesStorage'},
+}
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
@@ -74,6 +145,9 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 if not os.path.exists(MEDIA_ROOT):
     os.makedirs(MEDIA_ROOT)
 
+if not os.path.exists(ASSETS_DIR):
+    os.makedirs(ASSETS_DIR)
+
 AVATARS_DIR = os.path.join(MEDIA_ROOT, 'avatars')
 if not os.path.exists(AVATARS_DIR):
     os.makedirs(AVATARS_DIR)
@@ -93,8 +167,4 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
     ],
-}
-
-# Создаём папку для сессий при запуске
-if not os.path.exists(SESSION_FILE_PATH):
-    os.makedirs(SESSION_FILE_PATH)
\ No newline at end of file
+}
\ No newline at end of file
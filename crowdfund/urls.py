@@ -1,22 +1,36 @@
 # crowdfund/urls.py
 
-from django.urls import path, include
+import re
+
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from projects import views_sql
+from projects.assets import serve_static
+from projects.metrics import metrics_view
 
 urlpatterns = [
     # API эндпоинты
     path('api/register/', views_sql.api_register, name='api_register'),
     path('api/login/', views_sql.api_login, name='api_login'),
     path('api/profile/', views_sql.api_profile, name='api_profile'),
+    path('api/projects/', views_sql.api_projects, name='api_projects'),
+    path('api/projects/search/', views_sql.api_project_search, name='api_project_search'),
     path('api/forgot-password/', views_sql.api_forgot_password, name='api_forgot_password'),  # ← ДОБАВЛЕНО
     path('api/reset-password/', views_sql.api_reset_password, name='api_reset_password'), 
     
+    # Метрики Prometheus (доступ — METRICS_ALLOWED_IPS)
+    path('metrics', metrics_view, name='metrics'),
+    
     # Все остальные маршруты из приложения projects
     path('', include('projects.urls', namespace='projects')),
 ]
 
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
+    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
+elif settings.SERVE_STATIC:
+    # Собранная build_static статика: .br/.gz по Accept-Encoding, долгий кэш для имён с хешем
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % re.escape(settings.STATIC_URL.lstrip('/')), serve_static),
+    ]
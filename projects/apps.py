@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ProjectsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'projects'
+
+    def ready(self):
+        # Регистрация обработчиков фоновых задач (enqueue проверяет имя задачи)
+        from . import tasks  # noqa: F401
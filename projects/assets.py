@@ -0,0 +1,488 @@
+# projects/assets.py
+#
+# Сборка статики для продакшена (manage.py build_static).
+#
+# Картинки из static/Image пересжимаются в WebP и в JPEG (PNG, если есть
+# прозрачность) шириной IMAGE_WIDTHS, шрифты Inter — в WOFF2 только с нужными
+# символами, CSS и JS склеиваются и минифицируются в BUNDLES, а из CSS
+# выделяются правила для первого экрана (CRITICAL_CSS). Результат кладётся
+# в ASSETS_DIR (первая папка STATICFILES_DIRS) вместе с manifest.json, по
+# которому теги из templatetags/assets.py строят srcset, @font-face и
+# подключение CSS/JS. Затем collectstatic
+# (ManifestStaticFilesStorage) даёт файлам имена с хешем содержимого, и рядом
+# с ними сохраняются .gz и .br — их отдаёт nginx (gzip_static/brotli_static)
+# или serve_static, если SERVE_STATIC=True.
+
+from functools import lru_cache
+import gzip
+import json
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from PIL import Image
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+# Ширины вариантов картинок; больше исходной не делаются, исходная ширина (до
+# последнего значения) добавляется всегда
+IMAGE_WIDTHS = (80, 160, 320, 640, 960, 1280, 1920)
+IMAGE_SOURCES = ('Image',)
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+# Расширение -> (формат Pillow, параметры сохранения)
+IMAGE_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 6}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+    'png': ('PNG', {'optimize': True}),
+}
+
+# Начертание -> исходный файл; других в CSS нет, курсив не используется
+FONT_FAMILY = 'Inter'
+FONT_FACES = {
+    400: 'Inter/Inter-Regular.otf',
+    500: 'Inter/Inter-Medium.otf',
+    600: 'Inter/Inter-SemiBold.otf',
+    700: 'Inter/Inter-Bold.otf',
+}
+
+# Символы, которые остаются в WOFF2: латиница, кириллица, типографские знаки
+# и рубль; к ним добавляются все символы из шаблонов, CSS и JS
+FONT_UNICODES = (
+    (0x0020, 0x007E), (0x00A0, 0x00FF), (0x0400, 0x045F),
+    (0x2010, 0x2027), (0x2030, 0x203A), (0x20AC, 0x20AC), (0x20BD, 0x20BD),
+    (0x2116, 0x2116), (0x2122, 0x2122), (0x2190, 0x2193), (0x2212, 0x2212),
+)
+
+# Что сжимается заранее; картинки и WOFF2 уже сжаты
+COMPRESS_EXTENSIONS = ('.css', '.js', '.json', '.svg', '.txt', '.html', '.xml', '.map', '.otf', '.ttf')
+# Сжатая копия сохраняется, только если она меньше исходника хотя бы на 5%
+COMPRESS_MIN_RATIO = 0.95
+
+# Бандл -> исходники в порядке подключения; набор одинаков для всех страниц
+SITE_CSS = 'bundles/site.css'
+SITE_JS = 'bundles/site.js'
+BUNDLES = {
+    SITE_CSS: ('styles/reset.css', 'styles/main.css', 'styles/projects.css'),
+    SITE_JS: ('code/main.js',),
+}
+
+# Правила SITE_CSS для элементов первого экрана этих шаблонов (до FOLD_MARKER,
+# без метки — весь шаблон) встраиваются в <head>, остальное грузится без
+# блокировки отрисовки. Включается в шаблоне: {% stylesheets critical=True %}
+# в блоке stylesheets; прочие страницы подключают бандл блокирующим <link>
+CRITICAL_CSS = 'bundles/critical.css'
+CRITICAL_TEMPLATES = ('base.html', 'index.html', 'projects.html')
+FOLD_MARKER = '{# fold #}'
+
+MANIFEST_NAME = 'manifest.json'
+
+# Имя файла с хешем от ManifestStaticFilesStorage: art.0123456789ab.png
+_HASHED_RE = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+
+FAR_FUTURE = 'public, max-age=31536000, immutable'
+SHORT_CACHE = 'public, max-age=300'
+
+
+def _source_dir():
+    return os.path.join(settings.BASE_DIR, 'static')
+
+
+def _is_fresh(target, source):
+    return os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source)
+
+
+def _write_image(image, path, ext):
+    pil_format, options = IMAGE_FORMATS[ext]
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    image.save(path, pil_format, **options)
+
+
+def _widths(width):
+    widths = [w for w in IMAGE_WIDTHS if w < width]
+    widths.append(min(width, IMAGE_WIDTHS[-1]))
+    return widths
+
+
+def build_image(name, source_dir=None, assets_dir=None):
+    """Варианты одной картинки (name — путь от static/, например Image/art.png)
+
+    Возвращает запись манифеста: размеры исходника, ширины вариантов и
+    формат запасного варианта (jpg или png).
+    """
+    source_dir = source_dir or _source_dir()
+    assets_dir = assets_dir or settings.ASSETS_DIR
+    source = os.path.join(source_dir, name)
+    stem = os.path.splitext(name)[0]
+
+    with Image.open(source) as image:
+        image.load()
+        has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    fallback = 'png' if has_alpha else 'jpg'
+    widths = _widths(image.width)
+
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        rendition = None
+        for ext in ('webp', fallback):
+            path = os.path.join(assets_dir, f'{stem}-{width}w.{ext}')
+            if _is_fresh(path, source):
+                continue
+            if rendition is None:
+                rendition = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+            _write_image(rendition, path, ext)
+
+    return {'width': image.width, 'height': image.height, 'widths': widths, 'fallback': fallback}
+
+
+def _image_names(source_dir):
+    for folder in IMAGE_SOURCES:
+        root = os.path.join(source_dir, folder)
+        if not os.path.isdir(root):
+            continue
+        for dirpath, _, filenames in os.walk(root):
+            for filename in sorted(filenames):
+                if filename.lower().endswith(IMAGE_EXTENSIONS):
+                    path = os.path.join(dirpath, filename)
+                    yield os.path.relpath(path, source_dir).replace(os.sep, '/')
+
+
+def build_images(source_dir=None, assets_dir=None):
+    """Варианты всех картинок из IMAGE_SOURCES: {имя: запись манифеста}"""
+    source_dir = source_dir or _source_dir()
+    return {name: build_image(name, source_dir, assets_dir) for name in _image_names(source_dir)}
+
+
+def used_characters():
+    """Символы из шаблонов, CSS и JS проекта"""
+    roots = [os.path.join(settings.BASE_DIR, 'projects', 'templates'), _source_dir()]
+    chars = set()
+    for root in roots:
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                if filename.endswith(('.html', '.css', '.js')):
+                    with open(os.path.join(dirpath, filename), encoding='utf-8', errors='ignore') as f:
+                        chars.update(f.read())
+    return {ord(c) for c in chars if c.isprintable()}
+
+
+def font_unicodes():
+    unicodes = used_characters()
+    for first, last in FONT_UNICODES:
+        unicodes.update(range(first, last + 1))
+    return sorted(unicodes)
+
+
+def build_fonts(source_dir=None, assets_dir=None):
+    """WOFF2 с нужными символами для FONT_FACES: {начертание: имя WOFF2}
+
+    Нужны fontTools и brotli; без них возвращается пустой словарь, и
+    {% font_faces %} подключает исходные OTF.
+    """
+    try:
+        from fontTools import subset
+    except ImportError:
+        return {}
+    if brotli is None:
+        return {}
+
+    source_dir = source_dir or _source_dir()
+    assets_dir = assets_dir or settings.ASSETS_DIR
+    unicodes = None
+    fonts = {}
+    for weight, name in FONT_FACES.items():
+        source = os.path.join(source_dir, name)
+        woff2 = os.path.splitext(name)[0] + '.woff2'
+        target = os.path.join(assets_dir, woff2)
+        if not _is_fresh(target, source):
+            if unicodes is None:
+                unicodes = font_unicodes()
+            options = subset.Options()
+            options.flavor = 'woff2'
+            options.desubroutinize = True
+            font = subset.load_font(source, options)
+            subsetter = subset.Subsetter(options)
+            subsetter.populate(unicodes=unicodes)
+            subsetter.subset(font)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            subset.save_font(font, target, options)
+            font.close()
+        fonts[str(weight)] = woff2
+    return fonts
+
+
+# Строка CSS в кавычках или комментарий; комментарий внутри строки остаётся строкой
+_CSS_STRING_OR_COMMENT_RE = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|/\*.*?\*/', re.S)
+_CSS_STRING_RE = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')')
+
+
+def minify_css(css):
+    """Удаление комментариев и лишних пробелов; строки в кавычках не трогаются
+
+    Пробел перед «:» не удаляется — в селекторе «.a :hover» он значим.
+    """
+    css = _CSS_STRING_OR_COMMENT_RE.sub(lambda m: m.group(1) or '', css)
+    parts = _CSS_STRING_RE.split(css)
+    for i in range(0, len(parts), 2):
+        part = re.sub(r'\s+', ' ', parts[i])
+        part = re.sub(r'\s*([{};,>])\s*', r'\1', part)
+        parts[i] = re.sub(r':\s+', ':', part).replace(';}', '}')
+    return ''.join(parts).strip()
+
+
+def minify_js(js):
+    """Минификация rjsmin; без него JS только склеивается"""
+    return rjsmin.jsmin(js) if rjsmin is not None else js
+
+
+def _skip_string(css, pos):
+    quote = css[pos]
+    pos += 1
+    while pos < len(css) and css[pos] != quote:
+        pos += 2 if css[pos] == '\\' else 1
+    return pos + 1
+
+
+def _block_end(css, pos):
+    """Позиция «}», закрывающей блок, который начинается в pos"""
+    depth = 1
+    while pos < len(css):
+        c = css[pos]
+        if c in '"\'':
+            pos = _skip_string(css, pos)
+            continue
+        if c == '{':
+            depth += 1
+        elif c == '}':
+            depth -= 1
+            if not depth:
+                return pos
+        pos += 1
+    return pos
+
+
+def parse_css(css, pos=0):
+    """Разбор минифицированного CSS: [(прелюдия, тело)]
+
+    Тело @media и @supports — список правил, остальных — строка;
+    у @import и @charset тела нет (None).
+    """
+    rules = []
+    start = pos
+    while pos < len(css):
+        c = css[pos]
+        if c in '"\'':
+            pos = _skip_string(css, pos)
+            continue
+        if c == '{':
+            prelude = css[start:pos].strip()
+            if prelude.startswith(('@media', '@supports')):
+                body, pos = parse_css(css, pos + 1)
+            else:
+                end = _block_end(css, pos + 1)
+                body, pos = css[pos + 1:end], end + 1
+            rules.append((prelude, body))
+            start = pos
+            continue
+        if c == '}':
+            return rules, pos + 1
+        if c == ';' and css[start:pos].lstrip().startswith('@'):
+            rules.append((css[start:pos].strip(), None))
+            start = pos + 1
+        pos += 1
+    return rules, pos
+
+
+def serialize_css(rules):
+    out = []
+    for prelude, body in rules:
+        if body is None:
+            out.append(prelude + ';')
+        elif isinstance(body, list):
+            out.append(prelude + '{' + serialize_css(body) + '}')
+        else:
+            out.append(prelude + '{' + body + '}')
+    return ''.join(out)
+
+
+def fold_tokens(templates=CRITICAL_TEMPLATES):
+    """Теги, .классы и #id элементов первого экрана шаблонов"""
+    from django.template.loader import get_template
+
+    tokens = {'html', 'body'}
+    for name in templates:
+        with open(get_template(name).origin.name, encoding='utf-8') as f:
+            markup = f.read().split(FOLD_MARKER, 1)[0]
+        tokens.update(re.findall(r'<([a-zA-Z][\w-]*)', markup))
+        if '{% picture' in markup:
+            tokens.update(('picture', 'source', 'img'))
+        for value in re.findall(r'\bcss_class="([^"]*)"', markup):
+            tokens.update('.' + c for c in value.split())
+        # Условные классы: class="chip{% if … %} chip-active{% endif %}"
+        plain = re.sub(r'{%.*?%}|{{.*?}}', ' ', markup)
+        for value in re.findall(r'\bclass="([^"]*)"', plain):
+            tokens.update('.' + c for c in value.split())
+        for value in re.findall(r'\bid="([^"]*)"', plain):
+            tokens.update('#' + i for i in value.split())
+    return tokens
+
+
+def _selector_matches(selector, tokens):
+    """Все теги, классы и id селектора есть среди tokens (псевдоклассы не учитываются)"""
+    selector = re.sub(r'::?[\w-]+(\([^)]*\))?|\[[^\]]*\]', '', selector)
+    for part in re.findall(r'[.#]?-?[A-Za-z_][\w-]*', selector):
+        if part not in tokens:
+            return False
+    return True
+
+
+def _critical_rules(rules, tokens):
+    kept = []
+    for prelude, body in rules:
+        if isinstance(body, list):
+            nested = _critical_rules(body, tokens)
+            if nested:
+                kept.append((prelude, nested))
+        elif body is not None and not prelude.startswith('@') and any(
+            _selector_matches(s, tokens) for s in prelude.split(',')
+        ):
+            kept.append((prelude, body))
+    return kept
+
+
+def critical_rules(css, tokens):
+    """Правила css для элементов из tokens и используемые ими @keyframes"""
+    rules = parse_css(css)[0]
+    kept = _critical_rules(rules, tokens)
+    text = serialize_css(kept)
+    for prelude, body in rules:
+        if prelude.startswith('@keyframes') and prelude.split()[-1] in text:
+            kept.append((prelude, body))
+    return serialize_css(kept)
+
+
+def build_bundles(source_dir=None, assets_dir=None):
+    """BUNDLES и CRITICAL_CSS в assets_dir; возвращает имена собранных файлов"""
+    source_dir = source_dir or _source_dir()
+    assets_dir = assets_dir or settings.ASSETS_DIR
+    built = {}
+    for name, sources in BUNDLES.items():
+        texts = []
+        for source in sources:
+            with open(os.path.join(source_dir, source), encoding='utf-8') as f:
+                texts.append(f.read())
+        if name.endswith('.css'):
+            built[name] = minify_css('\n'.join(texts))
+        else:
+            built[name] = minify_js(';\n'.join(texts))
+    built[CRITICAL_CSS] = critical_rules(built[SITE_CSS], fold_tokens())
+
+    for name, text in built.items():
+        path = os.path.join(assets_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+    return sorted(built)
+
+
+def write_manifest(images, fonts, bundles, assets_dir=None):
+    path = os.path.join(assets_dir or settings.ASSETS_DIR, MANIFEST_NAME)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'images': images, 'fonts': fonts, 'bundles': bundles}, f,
+                  ensure_ascii=False, indent=1, sort_keys=True)
+    manifest.cache_clear()
+    critical_css.cache_clear()
+
+
+@lru_cache(maxsize=1)
+def manifest():
+    """Манифест последней сборки; пока сборки не было — пустой"""
+    try:
+        with open(os.path.join(settings.ASSETS_DIR, MANIFEST_NAME), encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+    return {'images': data.get('images', {}), 'fonts': data.get('fonts', {}), 'bundles': data.get('bundles', [])}
+
+
+@lru_cache(maxsize=1)
+def critical_css():
+    with open(os.path.join(settings.ASSETS_DIR, CRITICAL_CSS), encoding='utf-8') as f:
+        return f.read()
+
+
+def variant_name(name, width, ext):
+    return f'{os.path.splitext(name)[0]}-{width}w.{ext}'
+
+
+def _compress(path, data):
+    """Сохраняет path.gz и path.br; возвращает число записанных файлов"""
+    written = 0
+    compressors = [('.gz', lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        compressors.append(('.br', lambda d: brotli.compress(d, quality=11)))
+    for suffix, compress in compressors:
+        target = path + suffix
+        if _is_fresh(target, path):
+            continue
+        compressed = compress(data)
+        if len(compressed) < len(data) * COMPRESS_MIN_RATIO:
+            with open(target, 'wb') as f:
+                f.write(compressed)
+            written += 1
+    return written
+
+
+def precompress(root=None):
+    """.gz и .br для текстовых файлов в root (STATIC_ROOT); возвращает число файлов"""
+    root = root or settings.STATIC_ROOT
+    written = 0
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if not filename.lower().endswith(COMPRESS_EXTENSIONS):
+                continue
+            path = os.path.join(dirpath, filename)
+            with open(path, 'rb') as f:
+                written += _compress(path, f.read())
+    return written
+
+
+def serve_static(request, path):
+    """Отдача STATIC_ROOT без nginx: заранее сжатые копии и долгий кэш для имён с хешем"""
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404(path)
+    if not os.path.isfile(full_path):
+        raise Http404(path)
+
+    content_type, _ = mimetypes.guess_type(full_path)
+    accepted = request.headers.get('Accept-Encoding', '')
+    served, encoding = full_path, None
+    for suffix, name in (('.br', 'br'), ('.gz', 'gzip')):
+        if name in accepted and os.path.isfile(full_path + suffix):
+            served, encoding = full_path + suffix, name
+            break
+
+    response = FileResponse(open(served, 'rb'), content_type=content_type or 'application/octet-stream')
+    if encoding:
+        response['Content-Encoding'] = encoding
+    if os.path.isfile(full_path + '.gz') or os.path.isfile(full_path + '.br'):
+        patch_vary_headers(response, ('Accept-Encoding',))
+    response['Cache-Control'] = FAR_FUTURE if _HASHED_RE.search(path) else SHORT_CACHE
+    return response
@@ -0,0 +1,147 @@
+# projects/avatars.py
+#
+# Обработка загруженных аватаров. Картинка декодируется Pillow один раз,
+# поворачивается по EXIF, обрезается до квадрата и сохраняется в размерах
+# AVATAR_SIZES в WebP и JPEG без метаданных.
+#
+# Файлы называются по хешу пикселей: avatars/ab/abcdef0123456789abcd_128.webp,
+# поэтому одинаковые картинки хранятся один раз. В users.avatar записывается
+# URL наибольшего JPEG; URL других размеров и форматов получаются из него
+# (avatar_url, тег {% avatar %} в templatetags/avatars.py). Прежние аватары
+# (avatar_<id>_<время>.<ext>) отдаются как есть, пока их не переведёт
+# manage.py process_avatars.
+
+import hashlib
+import io
+import re
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .models_sql import User
+
+AVATAR_SIZES = (64, 128, 256)
+
+# Расширение -> (формат Pillow, параметры сохранения)
+AVATAR_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 6}),
+    'jpg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+
+ACCEPTED_FORMATS = {'JPEG', 'PNG', 'GIF', 'WEBP'}
+
+# Больше пикселей не декодируем: защита от «бомб» распаковки
+MAX_PIXELS = 40_000_000
+
+_PROCESSED_RE = re.compile(r'^(?P<base>.*avatars/[0-9a-f]{2}/[0-9a-f]{20})_\d+\.(?:webp|jpg)$')
+
+
+class AvatarError(ValueError):
+    """Файл нельзя использовать как аватар"""
+
+
+def _open(file):
+    """Декодирование загрузки в RGB/RGBA с поворотом по EXIF"""
+    largest = max(AVATAR_SIZES)
+    try:
+        image = Image.open(file)
+        if image.format not in ACCEPTED_FORMATS:
+            raise AvatarError("Разрешены только изображения JPG, PNG, GIF и WebP")
+        if image.width * image.height > MAX_PIXELS:
+            raise AvatarError("Слишком большое изображение")
+        # JPEG декодируется сразу с уменьшением (DCT-масштабирование), если исходник велик
+        image.draft('RGB', (largest, largest))
+        image.load()
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+        return image.convert('RGBA' if has_alpha else 'RGB')
+    except AvatarError:
+        raise
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as e:
+        raise AvatarError("Не удалось прочитать изображение") from e
+
+
+def _flatten(image):
+    """Прозрачность на белом фоне — для JPEG"""
+    if image.mode != 'RGBA':
+        return image
+    background = Image.new('RGB', image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def _name(digest, size, ext):
+    return f'avatars/{digest[:2]}/{digest}_{size}.{ext}'
+
+
+def _store(name, image, ext):
+    """Сохранение рендера, если файла с таким именем ещё нет"""
+    if default_storage.exists(name):
+        return
+    pil_format, options = AVATAR_FORMATS[ext]
+    buffer = io.BytesIO()
+    (image if ext == 'webp' else _flatten(image)).save(buffer, pil_format, **options)
+    saved = default_storage.save(name, ContentFile(buffer.getvalue()))
+    if saved != name:
+        # Тот же файл параллельно сохранил другой запрос — копия не нужна
+        default_storage.delete(saved)
+
+
+def save_avatar(file):
+    """Обработка загруженного аватара; возвращает URL для users.avatar"""
+    image = _open(file)
+    largest = max(AVATAR_SIZES)
+    master = ImageOps.fit(image, (largest, largest), Image.LANCZOS)
+    digest = hashlib.sha256(master.mode.encode() + master.tobytes()).hexdigest()[:20]
+
+    for size in sorted(AVATAR_SIZES, reverse=True):
+        rendition = master if size == largest else master.resize((size, size), Image.LANCZOS)
+        for ext in AVATAR_FORMATS:
+            _store(_name(digest, size, ext), rendition, ext)
+
+    return default_storage.url(_name(digest, largest, 'jpg'))
+
+
+def is_processed(url):
+    """URL аватара, сохранённого save_avatar (а не прежней загрузки или статики)"""
+    return bool(url and _PROCESSED_RE.match(url))
+
+
+def avatar_url(url, size, ext='jpg'):
+    """URL аватара ближайшего размера не меньше size (или наибольшего) в формате ext
+
+    Прежние и статические аватары возвращаются без изменений.
+    """
+    match = _PROCESSED_RE.match(url or '')
+    if not match:
+        return url
+    size = next((s for s in sorted(AVATAR_SIZES) if s >= size), max(AVATAR_SIZES))
+    return f'{match.group("base")}_{size}.{ext}'
+
+
+def _storage_name(url):
+    if url and url.startswith(settings.MEDIA_URL):
+        return url[len(settings.MEDIA_URL):]
+    return None
+
+
+def delete_avatar(url, active_only=False):
+    """Удаление файлов аватара, если этот URL больше не записан ни у кого
+
+    Одинаковые картинки хранятся один раз, а удаление выполняется в фоне:
+    к этому моменту тот же URL мог снова записать себе и прежний владелец,
+    и другой пользователь. Поэтому проверяются все строки users, кроме
+    деактивированных при active_only (удаление профиля).
+    """
+    name = _storage_name(url)
+    if not name or User.avatar_in_use(url, active_only=active_only):
+        return
+    if is_processed(url):
+        digest = _PROCESSED_RE.match(url).group('base').rsplit('/', 1)[1]
+        names = [_name(digest, size, ext) for size in AVATAR_SIZES for ext in AVATAR_FORMATS]
+    else:
+        names = [name]
+    for name in names:
+        default_storage.delete(name)
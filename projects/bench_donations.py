@@ -0,0 +1,109 @@
+# bench_donations.py
+#
+# Сравнение скорости создания пожертвований на локальном PostgreSQL:
+#   до   — INSERT, затем UPDATE суммы, UPDATE статуса и SELECT (4 запроса)
+#   после — Donation.create (один запрос с CTE)
+#
+# Запуск: python projects/bench_donations.py --project-id 1 -n 2000 --threads 4
+# Схема и индексы базы должны совпадать с рабочими: python manage.py migrate_sql
+# Созданные пожертвования удаляются, сумма и статус проекта восстанавливаются.
+import argparse
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal
+
+import django
+
+# Настройка Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'crowdfund.settings')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+django.setup()
+
+from projects.database import db
+from projects.models_sql import Donation, Project
+
+
+def create_legacy(project_id, amount):
+    """Прежний путь записи: четыре отдельные транзакции"""
+    result = db.execute_query("""
+        INSERT INTO donations (
+            project_id, donor_id, amount, amount_usdt_equivalent, currency,
+            email_receipt, bitpay_invoice_id, bitpay_status, is_anonymous, created_at
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        RETURNING id
+    """, (project_id, None, amount, amount, 'USDT_TRC20', '', None, 'new', True, datetime.now()))
+    donation_id = result[0]['id']
+    Project.update_collected_amount(project_id, amount)
+    Project.update_status(project_id)
+    return Donation.get_by_id(donation_id)
+
+
+def create_single(project_id, amount):
+    """Новый путь записи: один запрос"""
+    return Donation.create(
+        project_id=project_id,
+        amount=amount,
+        currency='USDT_TRC20',
+        amount_usdt_equivalent=amount,
+        is_anonymous=True,
+        bitpay_status='new',
+    )
+
+
+def run(name, create, project_id, total, threads):
+    created_ids = []
+    lock = threading.Lock()
+    per_thread = total // threads
+
+    def worker():
+        ids = [create(project_id, Decimal('0.01'))['id'] for _ in range(per_thread)]
+        with lock:
+            created_ids.extend(ids)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+
+    print(f"{name:<8} {len(created_ids):>7} пожертвований за {elapsed:7.2f} с "
+          f"= {len(created_ids) / elapsed:9.1f} donations/s")
+    return created_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк Donation.create')
+    parser.add_argument('--project-id', type=int, required=True)
+    parser.add_argument('-n', type=int, default=2000, help='число пожертвований на вариант')
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    project = db.execute_query(
+        "SELECT collected_amount, status FROM projects WHERE id = %s", (args.project_id,)
+    )
+    if not project:
+        print(f"❌ Проект {args.project_id} не найден")
+        return
+
+    created_ids = []
+    try:
+        created_ids += run('до', create_legacy, args.project_id, args.n, args.threads)
+        created_ids += run('после', create_single, args.project_id, args.n, args.threads)
+        print(f"📊 Пул соединений: {db.pool_stats()}")
+    finally:
+        if created_ids:
+            db.execute_update("DELETE FROM donations WHERE id = ANY(%s)", (created_ids,))
+        db.execute_update(
+            "UPDATE projects SET collected_amount = %s, status = %s WHERE id = %s",
+            (project[0]['collected_amount'], project[0]['status'], args.project_id)
+        )
+        db.disconnect()
+
+
+if __name__ == '__main__':
+    main()
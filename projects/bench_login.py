@@ -0,0 +1,84 @@
+# bench_login.py
+#
+# Пропускная способность проверки паролей при входе: bcrypt прямо в потоках
+# запросов против PasswordHasher с ограниченным пулом. Параллельно идут
+# «лёгкие» запросы (имитация просмотра страниц), чтобы видеть, сколько
+# их успевает обслужиться, пока идёт шквал входов.
+#
+# Запуск: python projects/bench_login.py --rounds 10 12 --threads 8 --seconds 5
+# База данных не нужна.
+import argparse
+import os
+import sys
+import threading
+import time
+
+import bcrypt
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from projects.models_sql import PasswordHasher, PasswordHasherBusy
+
+PASSWORD = 'correct horse battery staple'
+
+
+def page_view():
+    """Лёгкий запрос: немного CPU-работы в интерпретаторе"""
+    return sum(i * i for i in range(2000))
+
+
+def run(name, check, threads, seconds):
+    stop = time.perf_counter() + seconds
+    counts = {'logins': 0, 'busy': 0, 'pages': 0}
+    lock = threading.Lock()
+
+    def login_worker():
+        while time.perf_counter() < stop:
+            try:
+                check()
+                key = 'logins'
+            except PasswordHasherBusy:
+                key = 'busy'
+            with lock:
+                counts[key] += 1
+
+    def page_worker():
+        while time.perf_counter() < stop:
+            page_view()
+            with lock:
+                counts['pages'] += 1
+
+    workers = [threading.Thread(target=login_worker) for _ in range(threads)]
+    workers += [threading.Thread(target=page_worker) for _ in range(2)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+
+    print(f"{name:<28} входов: {counts['logins'] / seconds:7.1f}/с  "
+          f"отказов (busy): {counts['busy'] / seconds:7.1f}/с  "
+          f"страниц: {counts['pages'] / seconds:8.1f}/с")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк хеширования паролей при входе')
+    parser.add_argument('--rounds', type=int, nargs='+', default=[10, 12])
+    parser.add_argument('--threads', type=int, default=8, help='одновременных входов')
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    for rounds in args.rounds:
+        hashed = bcrypt.hashpw(PASSWORD.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+        hasher = PasswordHasher(rounds=rounds, max_workers=args.workers, max_pending=args.threads)
+
+        run(f'inline, cost={rounds}',
+            lambda: bcrypt.checkpw(PASSWORD.encode('utf-8'), hashed.encode('utf-8')),
+            args.threads, args.seconds)
+        run(f'пул x{args.workers}, cost={rounds}',
+            lambda: hasher.check(PASSWORD, hashed),
+            args.threads, args.seconds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# bench_sessions.py
+#
+# Сравнение файлового движка сессий Django с projects.session_store.
+# Сценарий похож на реальный трафик: каждая итерация загружает случайную
+# сессию, а каждая --write-every-я ещё и изменяет и сохраняет её.
+#
+# Запуск: python projects/bench_sessions.py -n 1000 --requests 20000 --threads 4
+# Схема и индексы базы должны совпадать с рабочими: python manage.py migrate_sql
+# Созданные бенчмарком сессии удаляются по окончании.
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from importlib import import_module
+
+import django
+
+# Настройка Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'crowdfund.settings')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+django.setup()
+
+from django.conf import settings
+
+from projects.database import db
+
+ENGINES = ['django.contrib.sessions.backends.file', 'projects.session_store']
+
+
+def run(engine, sessions, requests, threads, write_every):
+    SessionStore = import_module(engine).SessionStore
+
+    keys = []
+    for i in range(sessions):
+        store = SessionStore()
+        store['user_id'] = i
+        store['username'] = f'bench_{i}'
+        store.save()
+        keys.append(store.session_key)
+
+    per_thread = requests // threads
+
+    def worker(seed):
+        rnd = random.Random(seed)
+        for i in range(per_thread):
+            store = SessionStore(rnd.choice(keys))
+            store.get('user_id')
+            if i % write_every == 0:
+                store['last_seen'] = i
+                store.save()
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+
+    print(f"{engine:<42} {per_thread * threads:>7} запросов за {elapsed:7.2f} с "
+          f"= {per_thread * threads / elapsed:9.1f} req/s")
+
+    for key in keys:
+        SessionStore(key).delete()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк движков сессий')
+    parser.add_argument('-n', type=int, default=1000, help='число сессий')
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--write-every', type=int, default=10)
+    args = parser.parse_args()
+
+    # Файловые сессии бенчмарка не смешиваются с рабочими
+    settings.SESSION_FILE_PATH = tempfile.mkdtemp(prefix='bench_sessions_')
+    try:
+        for engine in ENGINES:
+            run(engine, args.n, args.requests, args.threads, args.write_every)
+    finally:
+        db.disconnect()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# projects/cache.py
+
+from collections import OrderedDict
+import threading
+import time
+
+
+class LRUCache:
+    """Потокобезопасный процессный кэш с вытеснением LRU и временем жизни записей
+
+    maxsize — максимальное число записей, ttl — время жизни записи в секундах
+    (None — без ограничения).
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        if maxsize < 1:
+            raise ValueError("Размер кэша должен быть больше 0")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = OrderedDict()  # ключ -> (значение, момент истечения или None)
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+
+    def get(self, key, default=None):
+        """Получение значения; просроченная запись считается отсутствующей"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self._counters['misses'] += 1
+                return default
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self._counters['expirations'] += 1
+                self._counters['misses'] += 1
+                return default
+            self._data.move_to_end(key)
+            self._counters['hits'] += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Сохранение значения (ttl переопределяет время жизни по умолчанию)"""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def delete(self, key):
+        """Удаление записи (отсутствие записи не является ошибкой)"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """Счётчики попаданий, промахов и вытеснений"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats.update({'size': len(self._data), 'maxsize': self.maxsize})
+        return stats
@@ -1,14 +1,675 @@
 # projects/database.py
 
+import asyncio
 import psycopg2
-from psycopg2.extras import RealDictCursor
-from contextlib import contextmanager
+import psycopg2.errors
+from psycopg2 import extensions, sql
+from psycopg2.extras import RealDictCursor, execute_values
+from contextlib import asynccontextmanager, contextmanager
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import date, datetime
+from functools import lru_cache
+import logging
 import os
+import re
+import threading
+import time
+import uuid
 from dotenv import load_dotenv
 
 # Загружаем переменные окружения из .env
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(psycopg2.OperationalError):
+    """Не удалось получить соединение из пула за отведённое время"""
+
+
+def _copy_value(value):
+    """Представление значения в текстовом формате COPY"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return (str(value)
+            .replace('\\', '\\\\')
+            .replace('\t', '\\t')
+            .replace('\n', '\\n')
+            .replace('\r', '\\r'))
+
+
+class _CopyStream:
+    """Файлоподобный объект для COPY FROM STDIN, читающий строки из итератора"""
+
+    def __init__(self, rows):
+        self._lines = ('\t'.join(_copy_value(v) for v in row) + '\n' for row in rows)
+        self._buffer = ''
+
+    def read(self, size=-1):
+        chunks = [self._buffer]
+        length = len(self._buffer)
+        while size < 0 or length < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            chunks.append(line)
+            length += len(line)
+        data = ''.join(chunks)
+        if size < 0:
+            self._buffer = ''
+            return data
+        self._buffer = data[size:]
+        return data[:size]
+
+
+# ---------------------------------------------------------------------------
+# Инструментирование запросов
+#
+# Хуки вызываются после каждого execute с QueryEvent. Пока ни одного хука нет,
+# курсоры создаются обычными RealDictCursor — накладных расходов нет вовсе.
+# ---------------------------------------------------------------------------
+
+
+# Длинные запросы (execute_values со значениями) нормализуются по префиксу
+FINGERPRINT_MAX_LENGTH = 1000
+
+_FINGERPRINT_RULES = [
+    (re.compile(r"'(?:[^']|'')*'"), '?'),            # строковые литералы
+    (re.compile(r'%s|\$\d+|\b\d+(?:\.\d+)?\b'), '?'),  # параметры и числа
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(?)'),  # списки значений
+    (re.compile(r'(?:\(\?\)\s*,\s*)+\(\?\)'), '(?)'),     # многострочный VALUES
+    (re.compile(r'\s+'), ' '),
+]
+
+
+@lru_cache(maxsize=2048)
+def _fingerprint(query):
+    for pattern, replacement in _FINGERPRINT_RULES:
+        query = pattern.sub(replacement, query)
+    return query.strip()
+
+
+def fingerprint(query):
+    """Нормализованный текст запроса: литералы и параметры заменены на «?»"""
+    return _fingerprint(query[:FINGERPRINT_MAX_LENGTH])
+
+
+class QueryEvent:
+    """Выполненный запрос: текст, длительность (с), число строк, ошибка или None
+
+    fingerprint вычисляется при первом обращении — хукам, которым он
+    не нужен, нормализация текста ничего не стоит.
+    """
+
+    __slots__ = ('sql', 'duration', 'rowcount', 'error', '_fingerprint')
+
+    def __init__(self, sql, duration, rowcount=-1, error=None):
+        self.sql = sql
+        self.duration = duration
+        self.rowcount = rowcount
+        self.error = error
+        self._fingerprint = None
+
+    @property
+    def fingerprint(self):
+        if self._fingerprint is None:
+            self._fingerprint = fingerprint(self.sql)
+        return self._fingerprint
+
+
+class InstrumentedCursor(RealDictCursor):
+    """RealDictCursor, сообщающий хукам о каждом выполненном запросе"""
+
+    hooks = ()
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        error = None
+        try:
+            return super().execute(query, vars)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._notify(query, time.perf_counter() - started, error)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        error = None
+        try:
+            return super().executemany(query, vars_list)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._notify(query, time.perf_counter() - started, error)
+
+    def copy_expert(self, sql, file, size=8192):
+        started = time.perf_counter()
+        error = None
+        try:
+            return super().copy_expert(sql, file, size)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._notify(sql, time.perf_counter() - started, error)
+
+    def _notify(self, query, duration, error):
+        text = query if isinstance(query, str) else query.as_string(self)
+        _call_hooks(self.hooks, QueryEvent(text, duration, self.rowcount, error))
+
+
+def _call_hooks(hooks, event):
+    for hook in hooks:
+        try:
+            hook(event)
+        except Exception:
+            # Ошибка наблюдателя не должна ломать сам запрос
+            logger.exception("Ошибка хука запросов %r", hook)
+
+
+class SlowQueryLog:
+    """Хук: запись запросов дольше threshold секунд"""
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+
+    def __call__(self, event):
+        if event.duration >= self.threshold:
+            logger.warning("Медленный запрос %.1f мс", event.duration * 1000, extra={
+                'duration_ms': round(event.duration * 1000, 1),
+                'rows': event.rowcount,
+                'query': event.fingerprint,
+            })
+
+
+class QueryStats:
+    """Запросы, выполненные в пределах track_queries()"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def add(self, event):
+        self.count += 1
+        self.duration += event.duration
+        self.fingerprints[event.fingerprint] += 1
+
+    def repeated(self, threshold):
+        """Запросы, повторённые не меньше threshold раз (вероятный N+1)"""
+        return [(fp, n) for fp, n in self.fingerprints.most_common() if n >= threshold]
+
+
+_current_stats = ContextVar('current_query_stats', default=None)
+
+
+def record_query(event):
+    """Хук: учёт запроса в QueryStats текущего контекста (если он открыт)"""
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.add(event)
+
+
+@contextmanager
+def track_queries():
+    """Подсчёт запросов в блоке (работает, только если подключён хук record_query)"""
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+class PooledConnection(extensions.connection):
+    """Соединение пула, помнящее подготовленные на нём выражения"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # PREPARE живёт до конца сессии, поэтому на новом соединении набор пуст
+        self.prepared_statements = set()
+
+
+class StatementRegistry:
+    """Реестр именованных запросов, выполняемых через PREPARE/EXECUTE
+
+    Запрос регистрируется один раз с обычными плейсхолдерами %s, которые
+    переводятся в $1, $2, ... для PREPARE. На каждом соединении выражение
+    подготавливается лениво — при первом выполнении.
+    """
+
+    _placeholder_re = re.compile(r'%%|%s')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._statements = {}  # имя -> (исходный SQL, SQL для PREPARE, число параметров)
+        self._counters = {}    # имя -> {'executions': ..., 'prepares': ...}
+
+    def register(self, name, query):
+        """Регистрация запроса под именем (повторная регистрация того же SQL допустима)"""
+        if not re.match(r'^[a-z_][a-z0-9_]*$', name):
+            raise ValueError(f"Некорректное имя подготовленного выражения: {name!r}")
+
+        counter = iter(range(1, query.count('%s') + 1))
+        prepared_sql = self._placeholder_re.sub(
+            lambda m: '%' if m.group() == '%%' else f'${next(counter)}', query
+        )
+        with self._lock:
+            existing = self._statements.get(name)
+            if existing and existing[0] != query:
+                raise ValueError(f"Выражение {name!r} уже зарегистрировано с другим SQL")
+            self._statements[name] = (query, prepared_sql, query.count('%s'))
+            self._counters.setdefault(name, {'executions': 0, 'prepares': 0})
+        return name
+
+    def get(self, name):
+        """Получение описания выражения по имени"""
+        try:
+            return self._statements[name]
+        except KeyError:
+            raise KeyError(f"Подготовленное выражение {name!r} не зарегистрировано") from None
+
+    def count(self, name, prepared):
+        """Учёт выполнения (и подготовки, если она понадобилась)"""
+        with self._lock:
+            counters = self._counters[name]
+            counters['executions'] += 1
+            if prepared:
+                counters['prepares'] += 1
+
+    def stats(self):
+        """Счётчики выполнений и подготовок по каждому выражению"""
+        with self._lock:
+            return {name: dict(counters) for name, counters in self._counters.items()}
+
+
+class ConnectionPool:
+    """Потокобезопасный ограниченный пул соединений psycopg2
+
+    Соединения выдаются через getconn() и возвращаются через putconn().
+    Если все max_size соединений заняты, поток ждёт освобождения не дольше
+    timeout секунд, после чего получает PoolTimeoutError.
+    """
+
+    def __init__(self, config, min_size=1, max_size=10, timeout=30.0, check_after=30.0):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Некорректные размеры пула: нужно 0 <= min_size <= max_size, max_size >= 1")
+
+        self.config = config
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        # Соединение, простоявшее в пуле дольше check_after секунд,
+        # проверяется запросом SELECT 1 перед выдачей (0 — проверять всегда)
+        self.check_after = check_after
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (connection, время возврата в пул)
+        self._size = 0        # открытые соединения: свободные + выданные
+        self._waiting = 0
+        self._closed = False
+        self._counters = {
+            'connections_created': 0,
+            'connections_discarded': 0,
+            'checkouts': 0,
+            'timeouts': 0,
+            'health_check_failures': 0,
+            'wait_time_total': 0.0,
+        }
+
+        for _ in range(min_size):
+            conn = self._open()
+            self._idle.append((conn, time.monotonic()))
+
+    def _open(self):
+        """Открытие нового физического соединения (вызывается под блокировкой или при старте)"""
+        conn = psycopg2.connect(connection_factory=PooledConnection, **self.config)
+        self._size += 1
+        self._counters['connections_created'] += 1
+        return conn
+
+    def _discard(self, conn):
+        """Закрытие соединения и освобождение места в пуле"""
+        try:
+            if not conn.closed:
+                conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._counters['connections_discarded'] += 1
+            self._cond.notify()
+
+    def _is_healthy(self, conn, idle_since):
+        """Проверка соединения перед выдачей"""
+        if conn.closed:
+            return False
+        if time.monotonic() - idle_since < self.check_after:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            with self._cond:
+                self._counters['health_check_failures'] += 1
+            return False
+
+    def getconn(self, timeout=None):
+        """Получение соединения из пула"""
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+
+        while True:
+            conn = None
+            with self._cond:
+                if self._closed:
+                    raise psycopg2.InterfaceError("Пул соединений закрыт")
+
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._counters['timeouts'] += 1
+                        raise PoolTimeoutError(
+                            f"Нет свободных соединений в пуле (max_size={self.max_size}) "
+                            f"за {timeout} с"
+                        )
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                else:
+                    # Резервируем место под новое соединение, открываем вне блокировки
+                    self._size += 1
+                    idle_since = None
+
+            if idle_since is None:
+                try:
+                    conn = psycopg2.connect(connection_factory=PooledConnection, **self.config)
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._counters['connections_created'] += 1
+            elif not self._is_healthy(conn, idle_since):
+                self._discard(conn)
+                continue
+
+            with self._cond:
+                self._counters['checkouts'] += 1
+                self._counters['wait_time_total'] += time.monotonic() - started
+            return conn
+
+    def putconn(self, conn, close=False):
+        """Возврат соединения в пул"""
+        if not close and not conn.closed:
+            # В пул возвращаем только соединения без незавершённой транзакции
+            if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except Exception:
+                    close = True
+        if close or conn.closed:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            if self._closed:
+                self._size -= 1
+                conn.close()
+                return
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def closeall(self):
+        """Закрытие всех свободных соединений и пула"""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.popleft()
+                self._size -= 1
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._cond.notify_all()
+
+    def stats(self):
+        """Текущее состояние пула"""
+        with self._cond:
+            stats = dict(self._counters)
+            stats.update({
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'waiting': self._waiting,
+            })
+        return stats
+
+
+def _set_ready(future):
+    if not future.done():
+        future.set_result(None)
+
+
+async def _wait(conn):
+    """Ожидание готовности асинхронного соединения psycopg2 через цикл событий"""
+    loop = asyncio.get_running_loop()
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            return
+        fd = conn.fileno()
+        ready = loop.create_future()
+        if state == extensions.POLL_READ:
+            loop.add_reader(fd, _set_ready, ready)
+            remove = loop.remove_reader
+        elif state == extensions.POLL_WRITE:
+            loop.add_writer(fd, _set_ready, ready)
+            remove = loop.remove_writer
+        else:
+            raise psycopg2.OperationalError(f"Неожиданное состояние соединения: {state}")
+        try:
+            await ready
+        finally:
+            remove(fd)
+
+
+class AsyncConnectionPool:
+    """Ограниченный пул асинхронных соединений psycopg2 для корутин
+
+    Соединения открываются в асинхронном режиме psycopg2 (async_=True):
+    пока идёт запрос, корутина ждёт сокет в цикле событий и не занимает
+    поток. Такие соединения всегда работают в autocommit — транзакции
+    остаются за синхронным get_cursor().
+
+    Пул не привязан к одному циклу событий (под WSGI каждое async-view
+    выполняется в своём): состояние защищено threading.Lock, который
+    не удерживается через await, а освободившееся соединение передаётся
+    ожидающей корутине в её собственном цикле (call_soon_threadsafe).
+    Соединения открываются по требованию; проверки перед выдачей нет —
+    оборвавшееся соединение закрывается после неудачного запроса.
+    """
+
+    def __init__(self, config, max_size=10, timeout=30.0):
+        if max_size < 1:
+            raise ValueError("Некорректный размер пула: нужно max_size >= 1")
+
+        self.config = config
+        self.max_size = max_size
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._idle = deque()
+        self._size = 0           # открытые соединения: свободные + выданные
+        self._waiters = deque()  # futures корутин, ждущих соединение
+        self._closed = False
+        self._counters = {
+            'connections_created': 0,
+            'connections_discarded': 0,
+            'checkouts': 0,
+            'timeouts': 0,
+            'wait_time_total': 0.0,
+        }
+
+    async def _open(self):
+        """Открытие нового физического соединения"""
+        conn = psycopg2.connect(connection_factory=PooledConnection, async_=True, **self.config)
+        try:
+            await _wait(conn)
+        except BaseException:
+            conn.close()
+            raise
+        return conn
+
+    def _next_waiter(self):
+        """Первая ещё ждущая корутина (вызывается под блокировкой)"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                return waiter
+        return None
+
+    def _hand_over(self, waiter, conn):
+        """Передача соединения (None — места под новое) ожидающей корутине"""
+        try:
+            waiter.get_loop().call_soon_threadsafe(self._deliver, waiter, conn)
+        except RuntimeError:
+            # Цикл событий ожидающего уже закрыт
+            self._return(conn)
+
+    def _deliver(self, waiter, conn):
+        if not waiter.done():
+            waiter.set_result(conn)
+        else:
+            # Ожидающий успел отвалиться по таймауту или отмене
+            self._return(conn)
+
+    def _return(self, conn):
+        if conn is None:
+            self._release_slot()
+        else:
+            self.putconn(conn)
+
+    def _release_slot(self):
+        """Освобождение места в пуле: его получает ожидающий или оно просто исчезает"""
+        with self._lock:
+            waiter = self._next_waiter()
+            if waiter is None:
+                self._size -= 1
+                return
+        self._hand_over(waiter, None)
+
+    async def getconn(self, timeout=None):
+        """Получение соединения из пула"""
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        waiter = None
+        with self._lock:
+            if self._closed:
+                raise psycopg2.InterfaceError("Пул соединений закрыт")
+            if self._idle:
+                conn = self._idle.pop()
+            elif self._size < self.max_size:
+                # Резервируем место под новое соединение, открываем вне блокировки
+                self._size += 1
+                conn = None
+            else:
+                waiter = asyncio.get_running_loop().create_future()
+                self._waiters.append(waiter)
+
+        if waiter is not None:
+            try:
+                # Придёт свободное соединение или None — место под новое
+                conn = await asyncio.wait_for(waiter, timeout)
+            except asyncio.TimeoutError:
+                with self._lock:
+                    self._counters['timeouts'] += 1
+                raise PoolTimeoutError(
+                    f"Нет свободных соединений в асинхронном пуле (max_size={self.max_size}) "
+                    f"за {timeout} с"
+                ) from None
+
+        if conn is None:
+            try:
+                conn = await self._open()
+            except BaseException:
+                self._release_slot()
+                raise
+            with self._lock:
+                self._counters['connections_created'] += 1
+
+        with self._lock:
+            self._counters['checkouts'] += 1
+            self._counters['wait_time_total'] += time.monotonic() - started
+        return conn
+
+    def putconn(self, conn, close=False):
+        """Возврат соединения в пул"""
+        if close or conn.closed:
+            try:
+                conn.close()
+            except Exception:
+                pass
+            with self._lock:
+                self._counters['connections_discarded'] += 1
+            self._release_slot()
+            return
+
+        with self._lock:
+            if self._closed:
+                self._size -= 1
+                conn.close()
+                return
+            waiter = self._next_waiter()
+            if waiter is None:
+                self._idle.append(conn)
+                return
+        self._hand_over(waiter, conn)
+
+    def closeall(self):
+        """Закрытие всех свободных соединений и пула"""
+        with self._lock:
+            self._closed = True
+            while self._idle:
+                conn = self._idle.popleft()
+                self._size -= 1
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+    def stats(self):
+        """Текущее состояние пула"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats.update({
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'waiting': sum(1 for waiter in self._waiters if not waiter.done()),
+            })
+        return stats
+
+
 class Database:
     def __init__(self):
         self.config = {
@@ -18,53 +679,299 @@ class Database:
             'password': os.getenv('DB_PASSWORD', 'drbsh'),
             'port': os.getenv('DB_PORT', '5432')
         }
-        self.connection = None
-    
+        self.pool_config = {
+            'min_size': int(os.getenv('DB_POOL_MIN', '1')),
+            'max_size': int(os.getenv('DB_POOL_MAX', '10')),
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', '30')),
+            'check_after': float(os.getenv('DB_POOL_CHECK_AFTER', '30')),
+        }
+        self.pool = None
+        # Асинхронный пул для async-view: свой предел соединений, таймаут ожидания общий
+        self.async_pool_config = {
+            'max_size': int(os.getenv('DB_ASYNC_POOL_MAX', '10')),
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', '30')),
+        }
+        self.async_pool = None
+        self._pool_lock = threading.Lock()
+        # Отключается, например, за pgbouncer в режиме transaction pooling
+        self.use_prepared = os.getenv('DB_PREPARED_STATEMENTS', 'True') == 'True'
+        self.statements = StatementRegistry()
+        self._query_hooks = ()
+        self._hooks_lock = threading.Lock()
+        slow_query_ms = float(os.getenv('DB_SLOW_QUERY_MS', '0'))
+        if slow_query_ms > 0:
+            self.add_query_hook(SlowQueryLog(slow_query_ms / 1000))
+
+    def add_query_hook(self, hook):
+        """Подключение хука hook(QueryEvent), вызываемого после каждого запроса"""
+        with self._hooks_lock:
+            if hook not in self._query_hooks:
+                self._query_hooks = self._query_hooks + (hook,)
+
+    def remove_query_hook(self, hook):
+        with self._hooks_lock:
+            self._query_hooks = tuple(h for h in self._query_hooks if h is not hook)
+
+    def _cursor(self, conn, **kwargs):
+        """Курсор со строками-словарями; инструментированный, только если есть хуки"""
+        hooks = self._query_hooks
+        if not hooks:
+            return conn.cursor(cursor_factory=RealDictCursor, **kwargs)
+        cursor = conn.cursor(cursor_factory=InstrumentedCursor, **kwargs)
+        cursor.hooks = hooks
+        return cursor
+
     def connect(self):
-        """Подключение к базе данных"""
-        if self.connection and not self.connection.closed:
-            return self.connection
-        
-        try:
-            self.connection = psycopg2.connect(**self.config)
-            return self.connection
-        except Exception as e:
-            print(f"❌ Ошибка подключения к базе данных: {e}")
-            raise
-    
+        """Создание пула соединений (при первом обращении)"""
+        if self.pool is not None:
+            return self.pool
+
+        with self._pool_lock:
+            if self.pool is None:
+                try:
+                    self.pool = ConnectionPool(self.config, **self.pool_config)
+                except Exception as e:
+                    logger.error("Ошибка подключения к базе данных: %s", e)
+                    raise
+        return self.pool
+
+    def aconnect(self):
+        """Создание асинхронного пула (при первом обращении; соединения открываются по требованию)"""
+        if self.async_pool is not None:
+            return self.async_pool
+
+        with self._pool_lock:
+            if self.async_pool is None:
+                self.async_pool = AsyncConnectionPool(self.config, **self.async_pool_config)
+        return self.async_pool
+
     def disconnect(self):
-        """Отключение от базы данных"""
-        if self.connection and not self.connection.closed:
-            self.connection.close()
-            self.connection = None
-    
+        """Закрытие пулов соединений"""
+        with self._pool_lock:
+            if self.pool is not None:
+                self.pool.closeall()
+                self.pool = None
+            if self.async_pool is not None:
+                self.async_pool.closeall()
+                self.async_pool = None
+
+    def pool_stats(self):
+        """Статистика пула соединений (пустой словарь, если пул ещё не создан)"""
+        return self.pool.stats() if self.pool is not None else {}
+
+    def async_pool_stats(self):
+        """Статистика асинхронного пула (пустой словарь, если он ещё не создан)"""
+        return self.async_pool.stats() if self.async_pool is not None else {}
+
     @contextmanager
     def get_cursor(self):
-        """Контекстный менеджер для работы с курсором"""
-        conn = self.connect()
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        """Контекстный менеджер для работы с курсором
+
+        На время блока соединение берётся из пула, после — возвращается.
+        """
+        pool = self.connect()
+        conn = pool.getconn()
+        broken = False
+        cursor = self._cursor(conn)
         try:
             yield cursor
             conn.commit()
         except Exception as e:
-            conn.rollback()
-            print(f"❌ Ошибка выполнения запроса: {e}")
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+            logger.error("Ошибка выполнения запроса: %s", e)
             raise
         finally:
             cursor.close()
-    
+            pool.putconn(conn, close=broken or bool(conn.closed))
+
+    @contextmanager
+    def autocommit_cursor(self):
+        """Курсор соединения в режиме autocommit
+
+        Нужен для команд, которые нельзя выполнять в транзакции
+        (CREATE INDEX CONCURRENTLY, VACUUM), и для явного BEGIN/COMMIT.
+        Перед возвратом в пул режим autocommit выключается.
+        """
+        pool = self.connect()
+        conn = pool.getconn()
+        broken = False
+        conn.autocommit = True
+        cursor = self._cursor(conn)
+        try:
+            yield cursor
+        except Exception as e:
+            logger.error("Ошибка выполнения запроса: %s", e)
+            raise
+        finally:
+            try:
+                # conn.rollback() в режиме autocommit ничего не отправляет —
+                # незакрытый явный BEGIN откатываем командой
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    cursor.execute("ROLLBACK")
+                cursor.close()
+                conn.autocommit = False
+            except Exception:
+                broken = True
+            pool.putconn(conn, close=broken or bool(conn.closed))
+
     def execute_query(self, query, params=None):
         """Выполнение SELECT запроса"""
         with self.get_cursor() as cursor:
             cursor.execute(query, params or ())
             return cursor.fetchall()
-    
+
+    def iter_query(self, query, params=None, batch_size=1000):
+        """Потоковое выполнение SELECT запроса через серверный курсор
+
+        Строки читаются пачками по batch_size (fetchmany), поэтому объём
+        памяти не зависит от размера выборки. Соединение остаётся занятым,
+        пока генератор не будет исчерпан или закрыт; при досрочном закрытии
+        незавершённая транзакция откатывается при возврате соединения в пул.
+        """
+        pool = self.connect()
+        conn = pool.getconn()
+        broken = False
+        cursor = self._cursor(conn, name=f'iter_{uuid.uuid4().hex}')
+        cursor.itersize = batch_size
+        try:
+            cursor.execute(query, params or ())
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+            cursor.close()
+            conn.commit()
+        except Exception as e:
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+            logger.error("Ошибка выполнения запроса: %s", e)
+            raise
+        finally:
+            if not cursor.closed:
+                try:
+                    cursor.close()
+                except Exception:
+                    broken = True
+            pool.putconn(conn, close=broken or bool(conn.closed))
+
+    def register_statement(self, name, query):
+        """Регистрация часто выполняемого запроса для PREPARE/EXECUTE"""
+        return self.statements.register(name, query)
+
+    def execute_prepared(self, name, params=None):
+        """Выполнение зарегистрированного запроса через EXECUTE
+
+        Если выражение ещё не подготовлено на выданном соединении,
+        сначала выполняется PREPARE.
+        """
+        query, prepared_sql, execute_sql, params = self._prepared_call(name, params)
+
+        if not self.use_prepared:
+            self.statements.count(name, prepared=False)
+            return self.execute_query(query, params)
+
+        with self.get_cursor() as cursor:
+            conn = cursor.connection
+            prepared = name not in conn.prepared_statements
+            if prepared:
+                cursor.execute(f"PREPARE {name} AS {prepared_sql}")
+                conn.prepared_statements.add(name)
+            try:
+                cursor.execute(execute_sql, params)
+            except psycopg2.errors.InvalidSqlStatementName:
+                # Сессия была сброшена (DISCARD ALL и т.п.) — подготовим заново в следующий раз
+                conn.prepared_statements.discard(name)
+                raise
+            self.statements.count(name, prepared)
+            return cursor.fetchall()
+
+    def _prepared_call(self, name, params):
+        """(исходный SQL, SQL для PREPARE, команда EXECUTE, параметры) выражения name"""
+        query, prepared_sql, param_count = self.statements.get(name)
+        params = tuple(params or ())
+        if len(params) != param_count:
+            raise ValueError(
+                f"Выражение {name!r} ожидает {param_count} параметров, передано {len(params)}"
+            )
+        if params:
+            execute_sql = f"EXECUTE {name} ({', '.join(['%s'] * len(params))})"
+        else:
+            execute_sql = f"EXECUTE {name}"
+        return query, prepared_sql, execute_sql, params
+
+    def statement_stats(self):
+        """Статистика подготовленных выражений: выполнения и PREPARE по именам"""
+        return self.statements.stats()
+
+    def execute_values(self, query, rows, template=None, page_size=1000, fetch=False):
+        """Многострочный запрос вида INSERT ... VALUES %s одной транзакцией
+
+        Строки отправляются страницами по page_size. При fetch=True
+        возвращаются строки, полученные со всех страниц (RETURNING/SELECT).
+        """
+        with self.get_cursor() as cursor:
+            result = execute_values(cursor, query, rows, template=template,
+                                    page_size=page_size, fetch=fetch)
+            return result if fetch else cursor.rowcount
+
+    def bulk_insert(self, table, columns, rows, method='values', returning=None, page_size=1000):
+        """Массовая вставка строк из итерируемого объекта
+
+        method='values' — многострочный INSERT ... VALUES (можно указать returning),
+        method='copy' — COPY FROM STDIN без промежуточной материализации строк.
+        Возвращает список строк RETURNING либо число вставленных строк.
+        """
+        target = sql.SQL('{} ({})').format(
+            sql.Identifier(table),
+            sql.SQL(', ').join(sql.Identifier(column) for column in columns),
+        )
+
+        if method == 'copy':
+            if returning:
+                raise ValueError("COPY не поддерживает RETURNING")
+            with self.get_cursor() as cursor:
+                query = sql.SQL('COPY {} FROM STDIN').format(target)
+                cursor.copy_expert(query.as_string(cursor.connection), _CopyStream(rows))
+                return cursor.rowcount
+
+        if method != 'values':
+            raise ValueError(f"Неизвестный способ вставки: {method}")
+
+        with self.get_cursor() as cursor:
+            query = sql.SQL('INSERT INTO {} VALUES %s').format(target)
+            if returning:
+                query += sql.SQL(' RETURNING ') + sql.SQL(', ').join(
+                    sql.Identifier(column) for column in returning
+                )
+            query = query.as_string(cursor.connection)
+            if returning:
+                return execute_values(cursor, query, rows, page_size=page_size, fetch=True)
+
+            inserted = 0
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= page_size:
+                    execute_values(cursor, query, batch, page_size=page_size)
+                    inserted += cursor.rowcount
+                    batch = []
+            if batch:
+                execute_values(cursor, query, batch, page_size=page_size)
+                inserted += cursor.rowcount
+            return inserted
+
     def execute_update(self, query, params=None):
         """Выполнение запроса на изменение данных (INSERT/UPDATE/DELETE)"""
         with self.get_cursor() as cursor:
             cursor.execute(query, params or ())
             return cursor.rowcount
-    
+
     def execute_insert(self, query, params=None):
         """Выполнение запроса на вставку с возвратом последнего ID"""
         with self.get_cursor() as cursor:
@@ -73,5 +980,85 @@ class Database:
             cursor.execute("SELECT LASTVAL();")
             return cursor.fetchone()['lastval']
 
+    # Асинхронный доступ (async-view под ASGI). Запросы выполняются в autocommit
+    # на соединениях AsyncConnectionPool и проходят через те же хуки запросов.
+
+    @asynccontextmanager
+    async def _aconnection(self):
+        pool = self.aconnect()
+        conn = await pool.getconn()
+        broken = False
+        try:
+            yield conn
+        except BaseException as e:
+            # Отменённый посреди запроса (CancelledError) или оборванный сеанс
+            # в пул не возвращается: на нём может остаться незавершённый запрос
+            broken = not isinstance(e, psycopg2.Error) or isinstance(
+                e, (psycopg2.OperationalError, psycopg2.InterfaceError)
+            )
+            if isinstance(e, Exception):
+                logger.error("Ошибка выполнения запроса: %s", e)
+            raise
+        finally:
+            pool.putconn(conn, close=broken or bool(conn.closed))
+
+    async def _aexecute(self, cursor, query, params=None):
+        hooks = self._query_hooks
+        started = time.perf_counter()
+        error = None
+        try:
+            cursor.execute(query, params)
+            await _wait(cursor.connection)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            if hooks:
+                text = query if isinstance(query, str) else query.as_string(cursor)
+                _call_hooks(hooks, QueryEvent(text, time.perf_counter() - started, cursor.rowcount, error))
+
+    async def fetch(self, query, params=None):
+        """Асинхронный SELECT: список строк-словарей"""
+        async with self._aconnection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                await self._aexecute(cursor, query, params or ())
+                return cursor.fetchall()
+
+    async def fetchrow(self, query, params=None):
+        """Асинхронный SELECT: первая строка или None"""
+        async with self._aconnection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                await self._aexecute(cursor, query, params or ())
+                return cursor.fetchone()
+
+    async def execute(self, query, params=None):
+        """Асинхронный INSERT/UPDATE/DELETE (autocommit): число затронутых строк"""
+        async with self._aconnection() as conn:
+            with conn.cursor() as cursor:
+                await self._aexecute(cursor, query, params or ())
+                return cursor.rowcount
+
+    async def fetch_prepared(self, name, params=None):
+        """Асинхронный вариант execute_prepared"""
+        query, prepared_sql, execute_sql, params = self._prepared_call(name, params)
+
+        if not self.use_prepared:
+            self.statements.count(name, prepared=False)
+            return await self.fetch(query, params)
+
+        async with self._aconnection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                prepared = name not in conn.prepared_statements
+                if prepared:
+                    await self._aexecute(cursor, f"PREPARE {name} AS {prepared_sql}")
+                    conn.prepared_statements.add(name)
+                try:
+                    await self._aexecute(cursor, execute_sql, params)
+                except psycopg2.errors.InvalidSqlStatementName:
+                    conn.prepared_statements.discard(name)
+                    raise
+                self.statements.count(name, prepared)
+                return cursor.fetchall()
+
 # Глобальный экземпляр базы данных
 db = Database()
\ No newline at end of file
@@ -0,0 +1,339 @@
+# projects/jobs.py
+#
+# Очередь фоновых задач в PostgreSQL (таблица jobs, миграция 0006).
+#
+# View ставит задачу через enqueue() и сразу отвечает; выполняет её воркер
+# manage.py run_jobs. Воркер забирает задачи через FOR UPDATE SKIP LOCKED —
+# несколько потоков и процессов не мешают друг другу и не берут одну задачу
+# дважды. Упавшая задача повторяется с экспоненциальной задержкой, после
+# max_attempts попыток остаётся в таблице со статусом 'dead'.
+#
+# Задача выполняется хотя бы один раз: если воркер упал после обработчика,
+# но до удаления задачи, она будет выполнена повторно. Поэтому обработчики
+# (projects/tasks.py) должны выдерживать повторный запуск.
+
+import json
+import logging
+import os
+import random
+import select
+import socket
+import threading
+import time
+import traceback
+
+import psycopg2
+from django.conf import settings
+
+from .database import db
+
+logger = logging.getLogger(__name__)
+
+# Канал LISTEN/NOTIFY: enqueue будит ждущих воркеров сразу, без опроса
+NOTIFY_CHANNEL = 'jobs'
+
+TASKS = {}
+
+
+class UnknownTaskError(LookupError):
+    """Задача с таким именем не зарегистрирована"""
+
+
+def task(name):
+    """Регистрация обработчика задачи: @task('avatars.delete')
+
+    Обработчик вызывается с аргументами из payload: handler(**payload).
+    """
+    def decorator(func):
+        if name in TASKS and TASKS[name] is not func:
+            raise ValueError(f"Задача {name} уже зарегистрирована")
+        TASKS[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, key=None, delay=0, max_attempts=None):
+    """Постановка задачи в очередь
+
+    payload — словарь аргументов обработчика (сериализуется в JSON);
+    key — задача с таким ключом, которая ещё ждёт выполнения, не дублируется;
+    delay — через сколько секунд задачу можно выполнять.
+    Возвращает id задачи или None, если такая задача уже ждёт.
+    """
+    if name not in TASKS:
+        raise UnknownTaskError(name)
+    return Job.create(
+        name, payload or {}, key=key, delay=delay,
+        max_attempts=max_attempts or getattr(settings, 'JOB_MAX_ATTEMPTS', 5),
+    )
+
+
+def retry_delay(attempts):
+    """Задержка перед попыткой attempts + 1: база * 2^(attempts-1), не больше предела, ±25%"""
+    base = getattr(settings, 'JOB_RETRY_BASE', 10)
+    limit = getattr(settings, 'JOB_RETRY_MAX', 3600)
+    delay = min(base * 2 ** max(attempts - 1, 0), limit)
+    return delay * random.uniform(0.75, 1.25)
+
+
+class Job:
+    @staticmethod
+    def create(name, payload, key=None, delay=0, max_attempts=5):
+        """Вставка задачи и NOTIFY в одном запросе; None — такая задача уже ждёт"""
+        query = f"""
+            WITH job AS (
+                INSERT INTO jobs (task, payload, key, run_at, max_attempts)
+                VALUES (%s, %s, %s, NOW() + %s * INTERVAL '1 second', %s)
+                ON CONFLICT (key) WHERE status = 'queued' DO NOTHING
+                RETURNING id
+            )
+            SELECT id, pg_notify('{NOTIFY_CHANNEL}', '') FROM job
+        """
+        result = db.execute_query(query, (name, json.dumps(payload), key, delay, max_attempts))
+        return result[0]['id'] if result else None
+
+    @staticmethod
+    def claim(worker_id):
+        """Следующая готовая задача, отмеченная как выполняемая воркером worker_id"""
+        query = """
+            UPDATE jobs
+            SET status = 'running', attempts = attempts + 1, locked_at = NOW(), locked_by = %s
+            WHERE id = (
+                SELECT id FROM jobs
+                WHERE status = 'queued' AND run_at <= NOW()
+                ORDER BY run_at, id
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, task, payload, key, attempts, max_attempts
+        """
+        result = db.execute_query(query, (worker_id,))
+        return result[0] if result else None
+
+    @staticmethod
+    def complete(job_id):
+        return db.execute_update("DELETE FROM jobs WHERE id = %s", (job_id,)) > 0
+
+    @staticmethod
+    def retry(job_id, error, delay):
+        """Возврат задачи в очередь через delay секунд
+
+        Если задача с тем же ключом уже ждёт, эта удаляется — ту выполнят вместо неё.
+        """
+        with db.get_cursor() as cursor:
+            cursor.execute("""
+                UPDATE jobs
+                SET status = 'queued', run_at = NOW() + %s * INTERVAL '1 second',
+                    last_error = %s, locked_at = NULL, locked_by = NULL
+                WHERE id = %s AND NOT EXISTS (
+                    SELECT 1 FROM jobs queued WHERE queued.key = jobs.key AND queued.status = 'queued'
+                )
+            """, (delay, error, job_id))
+            if not cursor.rowcount:
+                cursor.execute("DELETE FROM jobs WHERE id = %s", (job_id,))
+
+    @staticmethod
+    def bury(job_id, error):
+        """Перевод задачи в 'dead': попытки исчерпаны или обработчика нет"""
+        query = """
+            UPDATE jobs SET status = 'dead', last_error = %s, locked_at = NULL, locked_by = NULL
+            WHERE id = %s
+        """
+        return db.execute_update(query, (error, job_id)) > 0
+
+    @staticmethod
+    def requeue_stale(timeout):
+        """Возврат задач, которые дольше timeout секунд числятся за упавшими воркерами
+
+        Зависание считается попыткой: задачи без оставшихся попыток хоронятся.
+        """
+        with db.get_cursor() as cursor:
+            cursor.execute("""
+                UPDATE jobs
+                SET status = 'dead', last_error = 'Воркер не завершил задачу', locked_at = NULL, locked_by = NULL
+                WHERE status = 'running' AND locked_at < NOW() - %s * INTERVAL '1 second'
+                  AND attempts >= max_attempts
+            """, (timeout,))
+            buried = cursor.rowcount
+            # По одной задаче на ключ: NOT EXISTS видит снимок до UPDATE, и две
+            # зависшие задачи с одним ключом нарушили бы jobs_queued_key_idx
+            cursor.execute("""
+                UPDATE jobs
+                SET status = 'queued', locked_at = NULL, locked_by = NULL
+                WHERE status = 'running' AND id IN (
+                    SELECT id FROM (
+                        SELECT id, key, row_number() OVER (PARTITION BY key ORDER BY id) AS n
+                        FROM jobs
+                        WHERE status = 'running' AND locked_at < NOW() - %s * INTERVAL '1 second'
+                    ) stale
+                    WHERE key IS NULL OR (n = 1 AND NOT EXISTS (
+                        SELECT 1 FROM jobs queued WHERE queued.key = stale.key AND queued.status = 'queued'
+                    ))
+                )
+            """, (timeout,))
+            requeued = cursor.rowcount
+            cursor.execute("""
+                DELETE FROM jobs
+                WHERE status = 'running' AND locked_at < NOW() - %s * INTERVAL '1 second'
+            """, (timeout,))
+        return requeued, buried
+
+    @staticmethod
+    def retry_dead(task=None):
+        """Возврат задач из 'dead' в очередь с обнулёнными попытками
+
+        Из задач с одним ключом возвращается одна (с наименьшим id) и только
+        если с этим ключом никто не ждёт; остальные остаются в 'dead'.
+        """
+        query = """
+            UPDATE jobs
+            SET status = 'queued', attempts = 0, run_at = NOW(), locked_at = NULL, locked_by = NULL
+            WHERE status = 'dead' AND id IN (
+                SELECT id FROM (
+                    SELECT id, key, row_number() OVER (PARTITION BY key ORDER BY id) AS n
+                    FROM jobs
+                    WHERE status = 'dead' AND (%s::text IS NULL OR task = %s)
+                ) dead
+                WHERE key IS NULL OR (n = 1 AND NOT EXISTS (
+                    SELECT 1 FROM jobs queued WHERE queued.key = dead.key AND queued.status = 'queued'
+                ))
+            )
+        """
+        return db.execute_update(query, (task, task))
+
+    @staticmethod
+    def counts():
+        """Число задач по статусам"""
+        rows = db.execute_query("SELECT status, COUNT(*) AS count FROM jobs GROUP BY status")
+        return {row['status']: row['count'] for row in rows}
+
+
+class Worker:
+    """Пул потоков, выполняющих задачи из очереди
+
+    concurrency потоков забирают задачи независимо; когда задач нет, ждут
+    NOTIFY от enqueue (или poll_interval секунд). stop() дожидается
+    завершения текущих задач.
+    """
+
+    def __init__(self, concurrency=None, poll_interval=None, lock_timeout=None):
+        self.concurrency = concurrency or getattr(settings, 'JOB_CONCURRENCY', 2)
+        self.poll_interval = poll_interval or getattr(settings, 'JOB_POLL_INTERVAL', 5)
+        self.lock_timeout = lock_timeout or getattr(settings, 'JOB_LOCK_TIMEOUT', 600)
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self._stopping = threading.Event()
+        self._wakeup = threading.Condition()
+        self._threads = []
+        self.processed = 0
+        self.failed = 0
+        self._counter_lock = threading.Lock()
+
+    def run_one(self, worker_id):
+        """Выполнение одной задачи; False — готовых задач нет"""
+        job = Job.claim(worker_id)
+        if job is None:
+            return False
+
+        extra = {'job_id': job['id'], 'task': job['task'], 'attempt': job['attempts']}
+        handler = TASKS.get(job['task'])
+        if handler is None:
+            Job.bury(job['id'], f"Неизвестная задача {job['task']}")
+            logger.error("Неизвестная задача, перенесена в dead", extra=extra)
+            self._count(failed=True)
+            return True
+
+        started = time.perf_counter()
+        try:
+            handler(**job['payload'])
+        except Exception:
+            error = traceback.format_exc()
+            if job['attempts'] >= job['max_attempts']:
+                Job.bury(job['id'], error)
+                logger.error("Задача исчерпала попытки, перенесена в dead", extra=extra, exc_info=True)
+            else:
+                delay = retry_delay(job['attempts'])
+                Job.retry(job['id'], error, delay)
+                logger.warning("Задача упала, повтор через %.0f с", delay, extra=extra, exc_info=True)
+            self._count(failed=True)
+            return True
+
+        Job.complete(job['id'])
+        logger.info("Задача выполнена", extra=dict(extra, duration_ms=round((time.perf_counter() - started) * 1000, 1)))
+        self._count()
+        return True
+
+    def _count(self, failed=False):
+        with self._counter_lock:
+            self.processed += 1
+            self.failed += failed
+
+    def _loop(self, index):
+        worker_id = f'{self.name}/{index}'
+        while not self._stopping.is_set():
+            try:
+                busy = self.run_one(worker_id)
+            except psycopg2.Error:
+                # База недоступна: ждём и пробуем снова, не роняя поток
+                logger.exception("Ошибка очереди задач")
+                busy = False
+            if not busy:
+                with self._wakeup:
+                    self._wakeup.wait(self.poll_interval)
+
+    def _wake_all(self):
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def _listen(self):
+        """Отдельное соединение с LISTEN: будит потоки при новых задачах
+
+        Заодно раз в poll_interval возвращает в очередь задачи упавших воркеров.
+        """
+        conn = None
+        last_sweep = 0
+        while not self._stopping.is_set():
+            try:
+                if conn is None:
+                    conn = psycopg2.connect(**db.config)
+                    conn.autocommit = True
+                    conn.cursor().execute(f'LISTEN {NOTIFY_CHANNEL}')
+                if select.select([conn], [], [], self.poll_interval) != ([], [], []):
+                    conn.poll()
+                    if conn.notifies:
+                        conn.notifies.clear()
+                        self._wake_all()
+                if time.monotonic() - last_sweep >= self.poll_interval:
+                    last_sweep = time.monotonic()
+                    requeued, buried = Job.requeue_stale(self.lock_timeout)
+                    if requeued or buried:
+                        logger.warning("Задачи упавших воркеров: возвращено %d, в dead %d", requeued, buried)
+                        self._wake_all()
+            except psycopg2.Error:
+                logger.exception("Ошибка соединения LISTEN очереди задач")
+                if conn is not None:
+                    conn.close()
+                    conn = None
+                self._stopping.wait(self.poll_interval)
+        if conn is not None:
+            conn.close()
+
+    def start(self):
+        self._threads = [threading.Thread(target=self._listen, name='jobs-listener', daemon=True)]
+        self._threads += [
+            threading.Thread(target=self._loop, args=(i,), name=f'jobs-worker-{i}', daemon=True)
+            for i in range(self.concurrency)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Остановка после завершения выполняемых задач"""
+        self._stopping.set()
+        self._wake_all()
+        for thread in self._threads:
+            thread.join()
+
+    def drain(self):
+        """Выполнение всех готовых задач в текущем потоке (для --burst)"""
+        while self.run_one(f'{self.name}/burst'):
+            pass
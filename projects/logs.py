@@ -0,0 +1,110 @@
+# projects/logs.py
+#
+# Логирование приложения: JSON-записи по одной на строку, которые пишет
+# фоновый поток.
+#
+# Поток запроса только кладёт запись в ограниченную очередь (put_nowait) —
+# медленный stdout или journald его не задерживают. При переполнении очереди
+# запись отбрасывается и учитывается в счётчике dropped. Подключается через
+# settings.LOGGING (логгер «projects»).
+
+import atexit
+import copy
+from datetime import datetime, timezone
+import json
+import logging
+from logging.handlers import QueueHandler, QueueListener
+import queue
+import random
+import sys
+
+# Атрибуты LogRecord, которые не считаются дополнительными полями (extra=...)
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+
+class JsonFormatter(logging.Formatter):
+    """Запись в виде одной строки JSON: ts, level, logger, message, поля extra, exc"""
+
+    def format(self, record):
+        data = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exc'] = record.exc_text
+        if record.stack_info:
+            data['stack'] = record.stack_info
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Пропускает долю rate записей ниже WARNING; предупреждения и ошибки — все"""
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or self.rate >= 1 or random.random() < self.rate
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self):
+        # При остановке очередь может быть полной: ждём, пока поток её разгребёт
+        self.queue.put(self._sentinel)
+
+
+class BackgroundHandler(QueueHandler):
+    """Обработчик, передающий записи фоновому потоку через очередь
+
+    queue_size — предел очереди; всё, что сверх него, отбрасывается,
+    а не ждёт места. Поток пишет в stream (sys.stdout или sys.stderr)
+    и останавливается при завершении процесса, дописав очередь.
+    """
+
+    def __init__(self, stream='stdout', queue_size=10000):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.dropped = 0
+        target = logging.StreamHandler(getattr(sys, stream))
+        target.setFormatter(JsonFormatter())
+        self.listener = _Listener(self.queue, target)
+        self.listener.start()
+        atexit.register(self.close)
+
+    def prepare(self, record):
+        # Сообщение и traceback собираются здесь: аргументы могут измениться,
+        # а traceback держит кадры стека живыми. Поля extra остаются как есть.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            listener.stop()
+        super().close()
+
+
+def dropped_records():
+    """Записи, отброшенные обработчиками логгера projects из-за переполнения очереди"""
+    return sum(
+        handler.dropped for handler in logging.getLogger('projects').handlers
+        if isinstance(handler, BackgroundHandler)
+    )
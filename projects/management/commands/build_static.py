@@ -0,0 +1,38 @@
+# projects/management/commands/build_static.py
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from projects.assets import brotli, build_bundles, build_fonts, build_images, precompress, rjsmin, write_manifest
+
+
+class Command(BaseCommand):
+    help = ('Сборка статики: WebP/JPEG-варианты картинок, WOFF2 с нужными символами, '
+            'бандлы CSS/JS и критический CSS, collectstatic с хешами в именах и сжатые .gz/.br копии')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-collectstatic', action='store_true',
+                            help='Только собрать картинки, шрифты и бандлы в ASSETS_DIR')
+
+    def handle(self, *args, **options):
+        images = build_images()
+        self.stdout.write(f'✅ Картинок: {len(images)}')
+
+        fonts = build_fonts()
+        if fonts:
+            self.stdout.write(f'✅ Шрифтов WOFF2: {len(fonts)}')
+        else:
+            self.stderr.write('⚠️ fontTools или brotli не установлены — шрифты остаются в OTF')
+
+        bundles = build_bundles()
+        if rjsmin is None:
+            self.stderr.write('⚠️ rjsmin не установлен — JS склеивается без минификации')
+        self.stdout.write(f'✅ Бандлов: {len(bundles)}')
+        write_manifest(images, fonts, bundles)
+
+        if options['no_collectstatic']:
+            return
+        call_command('collectstatic', interactive=False, verbosity=options['verbosity'])
+        if brotli is None:
+            self.stderr.write('⚠️ brotli не установлен — сохраняются только .gz')
+        self.stdout.write(f'✅ Сжатых копий: {precompress()}')
@@ -0,0 +1,39 @@
+# projects/management/commands/export_donations.py
+
+import csv
+import sys
+
+from django.core.management.base import BaseCommand
+
+from projects.models_sql import Donation, Project
+
+COLUMNS = ('id', 'created_at', 'donor_name', 'amount', 'currency', 'amount_usdt_equivalent', 'bitpay_status', 'rolled_back_at')
+
+
+class Command(BaseCommand):
+    help = 'Выгрузка всех пожертвований проекта в CSV (строки читаются потоково)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('project_id', type=int)
+        parser.add_argument('--output', help='Файл для CSV (по умолчанию — stdout)')
+
+    def handle(self, *args, **options):
+        project_id = options['project_id']
+        if Project.get_by_id(project_id) is None:
+            self.stderr.write(f'❌ Проект {project_id} не найден')
+            return
+
+        out = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else sys.stdout
+        try:
+            writer = csv.writer(out)
+            writer.writerow(COLUMNS)
+            count = 0
+            # Серверный курсор: память не зависит от числа пожертвований
+            for donation in Donation.iter_by_project(project_id):
+                writer.writerow([donation[column] for column in COLUMNS])
+                count += 1
+        finally:
+            if out is not sys.stdout:
+                out.close()
+
+        self.stderr.write(f'✅ Выгружено пожертвований: {count}')
@@ -0,0 +1,71 @@
+# projects/management/commands/import_file_sessions.py
+
+import datetime
+import os
+
+from django.conf import settings
+from django.contrib.sessions.backends.base import SessionBase
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from projects.database import db
+
+
+class Command(BaseCommand):
+    help = 'Перенос файловых сессий (SESSION_FILE_PATH) в таблицу web_sessions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=getattr(settings, 'SESSION_FILE_PATH', None),
+                            help='Папка с файлами сессий')
+        parser.add_argument('--delete-files', action='store_true',
+                            help='Удалить файлы после успешного переноса')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not path or not os.path.isdir(path):
+            self.stderr.write(f'❌ Папка с сессиями не найдена: {path}')
+            return
+
+        prefix = settings.SESSION_COOKIE_NAME
+        decoder = SessionBase()
+        now = timezone.now()
+        rows, imported_files, skipped = [], [], 0
+
+        for filename in os.listdir(path):
+            file_path = os.path.join(path, filename)
+            if not filename.startswith(prefix) or not os.path.isfile(file_path):
+                continue
+            session_key = filename[len(prefix):]
+            with open(file_path, encoding='ascii') as f:
+                session_data = f.read()
+
+            # Срок жизни считается так же, как в файловом движке Django
+            data = decoder.decode(session_data)
+            expiry = data.get('_session_expiry')
+            if isinstance(expiry, str):
+                expire_date = datetime.datetime.fromisoformat(expiry)
+            else:
+                modified = datetime.datetime.fromtimestamp(
+                    os.stat(file_path).st_mtime, tz=datetime.timezone.utc
+                )
+                age = expiry if isinstance(expiry, int) else settings.SESSION_COOKIE_AGE
+                expire_date = modified + datetime.timedelta(seconds=age)
+
+            if not data or expire_date <= now:
+                skipped += 1
+                continue
+            rows.append((session_key, session_data, expire_date))
+            imported_files.append(file_path)
+
+        if rows:
+            db.execute_values(
+                "INSERT INTO web_sessions (session_key, session_data, expire_date) VALUES %s "
+                "ON CONFLICT (session_key) DO NOTHING",
+                rows
+            )
+
+        if options['delete_files']:
+            for file_path in imported_files:
+                os.remove(file_path)
+
+        self.stdout.write(f'✅ Перенесено сессий: {len(rows)}, пропущено (пустые/просроченные): {skipped}')
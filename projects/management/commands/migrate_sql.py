@@ -0,0 +1,43 @@
+# projects/management/commands/migrate_sql.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.database import db
+from projects.schema import MigrationError, MigrationRunner
+
+
+class Command(BaseCommand):
+    help = 'Применение версионированных SQL-миграций из projects/sql/migrations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('target', nargs='?', type=int,
+                            help='Применить миграции до этой версии включительно')
+        parser.add_argument('--plan', action='store_true',
+                            help='Показать состояние миграций, ничего не применяя')
+        parser.add_argument('--fake', action='store_true',
+                            help='Отметить миграции применёнными без выполнения SQL')
+
+    def handle(self, *args, **options):
+        try:
+            runner = MigrationRunner()
+
+            for migration in runner.changed():
+                self.stderr.write(f'⚠️ Файл {migration} изменён после применения')
+
+            if options['plan']:
+                for migration, row in runner.status():
+                    mark = f"✅ {row['applied_at']:%Y-%m-%d %H:%M}" if row else '⏳ ожидает'
+                    mode = '' if migration.transactional else ' [вне транзакции]'
+                    self.stdout.write(f'{migration}{mode}: {mark}')
+                return
+
+            done = runner.migrate(target=options['target'], fake=options['fake'], log=self.stdout.write)
+        except MigrationError as e:
+            raise CommandError(f'❌ {e}')
+        finally:
+            db.disconnect()
+
+        if done:
+            self.stdout.write(f'✅ Применено миграций: {len(done)}')
+        else:
+            self.stdout.write('✅ Схема актуальна, новых миграций нет')
@@ -0,0 +1,42 @@
+# projects/management/commands/process_avatars.py
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from projects.avatars import AvatarError, delete_avatar, is_processed, save_avatar
+from projects.database import db
+from projects.models_sql import User
+
+
+class Command(BaseCommand):
+    help = ('Перевод загруженных ранее аватаров (исходные файлы) в уменьшенные '
+            'WebP/JPEG с именами по хешу содержимого')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-originals', action='store_true',
+                            help='Не удалять исходные файлы после обработки')
+
+    def handle(self, *args, **options):
+        rows = db.execute_query(
+            "SELECT id, avatar FROM users WHERE avatar LIKE %s ORDER BY id",
+            (settings.MEDIA_URL + '%',)
+        )
+        done = failed = 0
+        for row in rows:
+            if is_processed(row['avatar']):
+                continue
+            name = row['avatar'][len(settings.MEDIA_URL):]
+            try:
+                with default_storage.open(name, 'rb') as f:
+                    url = save_avatar(f)
+            except (OSError, AvatarError) as e:
+                self.stderr.write(f'⚠️ Пользователь {row["id"]}: {name}: {e}')
+                failed += 1
+                continue
+            User.update(row['id'], avatar=url)
+            if not options['keep_originals']:
+                delete_avatar(row['avatar'])
+            done += 1
+
+        self.stdout.write(f'✅ Обработано аватаров: {done}, с ошибками: {failed}')
@@ -0,0 +1,39 @@
+# projects/management/commands/rebuild_project_cards.py
+
+from django.core.management.base import BaseCommand
+
+from projects.database import db
+
+
+class Command(BaseCommand):
+    help = ('Полная пересборка модели чтения project_cards и счётчиков фасетов '
+            '(таблицы и триггеры создаёт migrate_sql)')
+
+    def handle(self, *args, **options):
+        with db.get_cursor() as cursor:
+            cursor.execute("DELETE FROM project_cards")
+            cursor.execute("""
+                INSERT INTO project_cards (
+                    id, owner_id, owner_username, owner_avatar,
+                    category_id, category_name, category_slug, category_icon,
+                    title, slogan, image, status, target_amount, collected_amount, deadline, created_at
+                )
+                SELECT
+                    p.id, p.owner_id, u.username, u.avatar,
+                    p.category_id, c.name, c.slug, c.icon,
+                    p.title, p.slogan, p.image, p.status, p.target_amount, p.collected_amount, p.deadline, p.created_at
+                FROM projects p
+                JOIN users u ON p.owner_id = u.id
+                JOIN categories c ON p.category_id = c.id
+                WHERE p.status <> 'draft'
+            """)
+            count = cursor.rowcount
+            # Счётчики фасетов пересчитываются с нуля вместе с карточками
+            cursor.execute("DELETE FROM project_card_counts")
+            cursor.execute("""
+                INSERT INTO project_card_counts (status, category_id, count)
+                SELECT status, category_id, COUNT(*) FROM project_cards
+                GROUP BY status, category_id
+            """)
+
+        self.stdout.write(f'✅ Карточек проектов: {count}')
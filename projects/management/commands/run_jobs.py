@@ -0,0 +1,59 @@
+# projects/management/commands/run_jobs.py
+
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from projects.database import db
+from projects.jobs import Job, Worker
+
+
+class Command(BaseCommand):
+    help = 'Воркер фоновых задач из таблицы jobs (остановка — SIGTERM или Ctrl+C)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=settings.JOB_CONCURRENCY,
+                            help='Число потоков, выполняющих задачи')
+        parser.add_argument('--burst', action='store_true',
+                            help='Выполнить готовые задачи и выйти')
+        parser.add_argument('--stats', action='store_true',
+                            help='Показать число задач по статусам и выйти')
+        parser.add_argument('--retry-dead', nargs='?', const='', metavar='TASK',
+                            help='Вернуть в очередь задачи из dead (все или только TASK) и выйти')
+
+    def handle(self, *args, **options):
+        try:
+            if options['stats']:
+                counts = Job.counts()
+                for status in ('queued', 'running', 'dead'):
+                    self.stdout.write(f'{status}: {counts.get(status, 0)}')
+                return
+
+            if options['retry_dead'] is not None:
+                count = Job.retry_dead(options['retry_dead'] or None)
+                self.stdout.write(f'✅ Возвращено в очередь: {count}')
+                return
+
+            worker = Worker(concurrency=options['concurrency'])
+            if options['burst']:
+                worker.drain()
+            else:
+                self._run(worker)
+            self.stdout.write(f'✅ Выполнено задач: {worker.processed}, с ошибкой: {worker.failed}')
+        finally:
+            db.disconnect()
+
+    def _run(self, worker):
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+        worker.start()
+        self.stdout.write(f'🚀 Воркер {worker.name}: потоков {worker.concurrency}')
+        try:
+            while not stop.wait(1):
+                pass
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write('⏳ Остановка: ждём завершения текущих задач')
+        worker.stop()
@@ -0,0 +1,299 @@
+# projects/metrics.py
+#
+# Метрики приложения в текстовом формате Prometheus (GET /metrics).
+#
+# Счётчики и гистограммы пишутся в шарды своего потока — без блокировок на
+# горячем пути; при чтении шарды всех потоков суммируются. Значения, которые
+# и так хранятся в других объектах (пул соединений, кэши), не дублируются,
+# а снимаются в момент запроса /metrics.
+
+from bisect import bisect_left
+import logging
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+# Границы корзин гистограмм по умолчанию, секунды
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Шарды завершившихся потоков сливаются в общий итог, когда их накопится столько
+_RETIRE_AFTER = 64
+
+REGISTRY = []
+
+logger = logging.getLogger(__name__)
+
+
+class _Shards:
+    """Значения по потокам: каждый поток пишет только в свой словарь"""
+
+    def __init__(self, merge):
+        self._merge = merge       # merge(итог, ключ, значение шарда)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []         # [(поток, словарь)]
+        self._retired = {}        # итог потоков, которых уже нет
+
+    def mine(self):
+        shard = getattr(self._local, 'values', None)
+        if shard is None:
+            shard = self._local.values = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+                if len(self._shards) > _RETIRE_AFTER:
+                    self._retire()
+        return shard
+
+    def _retire(self):
+        alive = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                for key, value in list(shard.items()):
+                    self._merge(self._retired, key, value)
+        self._shards = alive
+
+    def collect(self):
+        """Сумма по всем потокам: {метки: значение}"""
+        with self._lock:
+            self._retire()
+            total = {}
+            for key, value in self._retired.items():
+                self._merge(total, key, value)
+            for _, shard in self._shards:
+                for key, value in list(shard.items()):
+                    self._merge(total, key, value)
+        return total
+
+
+def _merge_number(total, key, value):
+    total[key] = total.get(key, 0) + value
+
+
+def _merge_list(total, key, value):
+    current = total.get(key)
+    if current is None:
+        total[key] = list(value)
+    else:
+        for i, v in enumerate(value):
+            current[i] += v
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    pairs.extend(f'{n}="{v}"' for n, v in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Монотонный счётчик с метками: COUNTER.inc('метка', ..., amount=1)"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._shards = _Shards(_merge_number)
+        REGISTRY.append(self)
+
+    def inc(self, *labels, amount=1):
+        shard = self._shards.mine()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in sorted(self._shards.collect().items()):
+            yield self.name, _labels(self.labelnames, labels), value
+
+
+class Histogram:
+    """Гистограмма с метками: HISTOGRAM.observe(значение, 'метка', ...)"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._shards = _Shards(_merge_list)
+        REGISTRY.append(self)
+
+    def observe(self, value, *labels):
+        shard = self._shards.mine()
+        # [счётчики корзин..., +Inf, сумма]
+        row = shard.get(labels)
+        if row is None:
+            row = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        row[bisect_left(self.buckets, value)] += 1
+        row[-1] += value
+
+    def samples(self):
+        for labels, row in sorted(self._shards.collect().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), row[:-1]):
+                cumulative += count
+                yield (f'{self.name}_bucket',
+                       _labels(self.labelnames, labels, [('le', _number(bound))]), cumulative)
+            yield f'{self.name}_sum', _labels(self.labelnames, labels), row[-1]
+            yield f'{self.name}_count', _labels(self.labelnames, labels), cumulative
+
+
+class CallbackMetric:
+    """Значения, снимаемые в момент чтения: callback() -> {(метки...): значение}"""
+
+    def __init__(self, name, documentation, kind, labelnames, callback):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        REGISTRY.append(self)
+
+    def samples(self):
+        for labels, value in sorted(self.callback().items()):
+            yield self.name, _labels(self.labelnames, labels), value
+
+
+def render_metrics():
+    """Все метрики в текстовом формате Prometheus 0.0.4"""
+    lines = []
+    for metric in REGISTRY:
+        try:
+            samples = list(metric.samples())
+        except Exception:
+            logger.exception("Не удалось снять метрику %s", metric.name)
+            continue
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        for name, labels, value in samples:
+            lines.append(f'{name}{labels} {_number(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """GET /metrics — только с адресов из METRICS_ALLOWED_IPS"""
+    allowed = getattr(settings, 'METRICS_ALLOWED_IPS', ('127.0.0.1', '::1'))
+    if request.META.get('REMOTE_ADDR') not in allowed:
+        return HttpResponseForbidden('Forbidden')
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# ---------------------------------------------------------------------------
+# Метрики приложения
+# ---------------------------------------------------------------------------
+
+REQUEST_SECONDS = Histogram(
+    'stakeup_http_request_duration_seconds', 'Длительность HTTP-запросов по view',
+    ('view', 'method', 'status')
+)
+
+DB_QUERY_SECONDS = Histogram(
+    'stakeup_db_query_duration_seconds', 'Длительность запросов к PostgreSQL по типу команды',
+    ('command',)
+)
+DB_QUERY_ERRORS = Counter(
+    'stakeup_db_query_errors_total', 'Запросы к PostgreSQL, завершившиеся ошибкой', ('command',)
+)
+
+SESSION_SECONDS = Histogram(
+    'stakeup_session_store_duration_seconds', 'Загрузка и сохранение сессий',
+    ('operation',)
+)
+
+DONATIONS_CREATED = Counter(
+    'stakeup_donations_created_total', 'Созданные пожертвования', ('source',)
+)
+DONATIONS_USDT = Counter(
+    'stakeup_donations_usdt_total', 'Сумма созданных пожертвований в эквиваленте USDT', ('source',)
+)
+
+WEBHOOK_SECONDS = Histogram(
+    'stakeup_bitpay_webhook_duration_seconds', 'Обработка вебхуков BitPay по результату',
+    ('result',)
+)
+
+_SQL_COMMANDS = {'SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH', 'EXECUTE', 'PREPARE', 'COPY'}
+
+
+def record_query_metrics(event):
+    """Хук Database: длительность запроса по первой команде SQL"""
+    words = event.sql.lstrip().split(None, 1)
+    command = words[0].upper() if words else ''
+    if command not in _SQL_COMMANDS:
+        command = 'OTHER'
+    DB_QUERY_SECONDS.observe(event.duration, command)
+    if event.error is not None:
+        DB_QUERY_ERRORS.inc(command)
+
+
+def _pool_values(keys, stats_method='pool_stats'):
+    def callback():
+        from .database import db
+        stats = getattr(db, stats_method)()
+        return {(key,): stats[key] for key in keys if key in stats}
+    return callback
+
+
+def _cache_values(keys):
+    def callback():
+        from .models_sql import user_cache
+        from .session_store import session_cache
+        from .templatetags.project_cards import card_cache
+        values = {}
+        for name, cache in (('user', user_cache), ('session', session_cache), ('project_card', card_cache)):
+            stats = cache.stats()
+            for key in keys:
+                values[(name, key)] = stats[key]
+        return values
+    return callback
+
+
+CallbackMetric(
+    'stakeup_db_pool_connections', 'Соединения пула по состоянию', 'gauge', ('state',),
+    _pool_values(('size', 'idle', 'in_use', 'waiting', 'max_size'))
+)
+CallbackMetric(
+    'stakeup_db_pool_events_total', 'События пула соединений', 'counter', ('event',),
+    _pool_values(('checkouts', 'connections_created', 'connections_discarded',
+                  'health_check_failures', 'timeouts'))
+)
+CallbackMetric(
+    'stakeup_db_async_pool_connections', 'Соединения асинхронного пула по состоянию', 'gauge', ('state',),
+    _pool_values(('size', 'idle', 'in_use', 'waiting', 'max_size'), 'async_pool_stats')
+)
+CallbackMetric(
+    'stakeup_db_async_pool_events_total', 'События асинхронного пула соединений', 'counter', ('event',),
+    _pool_values(('checkouts', 'connections_created', 'connections_discarded', 'timeouts'), 'async_pool_stats')
+)
+CallbackMetric(
+    'stakeup_cache_entries', 'Записей в процессных кэшах', 'gauge', ('cache', 'kind'),
+    _cache_values(('size', 'maxsize'))
+)
+CallbackMetric(
+    'stakeup_cache_operations_total', 'Обращения к процессным кэшам', 'counter', ('cache', 'result'),
+    _cache_values(('hits', 'misses', 'evictions', 'expirations'))
+)
+
+
+def _log_values():
+    from .logs import dropped_records
+    return {(): dropped_records()}
+
+
+CallbackMetric(
+    'stakeup_log_records_dropped_total', 'Записи лога, отброшенные из-за переполнения очереди',
+    'counter', (), _log_values
+)
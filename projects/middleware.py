@@ -0,0 +1,232 @@
+# projects/middleware.py
+
+import cProfile
+import logging
+import os
+import random
+import re
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.functional import SimpleLazyObject
+from .database import db, record_query, track_queries
+from .metrics import REQUEST_SECONDS, record_query_metrics
+from .models_sql import User
+from .profiling import collect_timings, record_query_time
+
+logger = logging.getLogger(__name__)
+
+
+def get_current_user(request):
+    """Пользователь текущей сессии (строка users) или None
+
+    Загружается не более одного раза за запрос; сам User.get_by_id
+    дополнительно обслуживается межзапросным кэшем.
+    """
+    if not hasattr(request, '_cached_current_user'):
+        user_id = request.session.get('user_id')
+        request._cached_current_user = User.get_by_id(user_id) if user_id else None
+    return request._cached_current_user
+
+
+async def aget_current_user(request):
+    """Асинхронный вариант get_current_user для async-view
+
+    Сессия и пользователь читаются без блокировки цикла событий; после
+    этого get_current_user(request) и request.session отдают данные из памяти.
+    """
+    if not hasattr(request, '_cached_current_user'):
+        session = request.session
+        if hasattr(session, 'aensure_loaded'):
+            await session.aensure_loaded()
+        user_id = session.get('user_id')
+        request._cached_current_user = await User.aget_by_id(user_id) if user_id else None
+    return request._cached_current_user
+
+
+def reset_current_user(request):
+    """Сброс закэшированного пользователя запроса (после входа, выхода или изменения профиля)"""
+    if hasattr(request, '_cached_current_user'):
+        del request._cached_current_user
+
+
+class _HybridMiddleware:
+    """Middleware для синхронной (WSGI) и асинхронной (ASGI) цепочки
+
+    В асинхронной цепочке Django вызывает его напрямую, без перехода
+    в поток через sync_to_async. Наследник реализует call() и acall().
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.acall(request)
+        return self.call(request)
+
+
+class CurrentUserMiddleware(_HybridMiddleware):
+    """Добавляет request.current_user — лениво загружаемого пользователя сессии"""
+
+    def call(self, request):
+        request.current_user = SimpleLazyObject(lambda: get_current_user(request))
+        return self.get_response(request)
+
+    async def acall(self, request):
+        request.current_user = SimpleLazyObject(lambda: get_current_user(request))
+        return await self.get_response(request)
+
+
+class QueryCountMiddleware(_HybridMiddleware):
+    """Подсчёт запросов к базе на HTTP-запрос и поиск повторяющихся запросов (N+1)
+
+    Включается настройкой QUERY_TRACKING; если она выключена, middleware
+    исключается из цепочки, а хук запросов не подключается. Запрос,
+    повторённый QUERY_REPEAT_THRESHOLD раз и больше, попадает в лог.
+    В режиме DEBUG число и суммарное время запросов отдаются в заголовке
+    X-DB-Queries.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_TRACKING', False):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.threshold = getattr(settings, 'QUERY_REPEAT_THRESHOLD', 5)
+        db.add_query_hook(record_query)
+
+    def call(self, request):
+        with track_queries() as stats:
+            response = self.get_response(request)
+        return self._report(request, response, stats)
+
+    async def acall(self, request):
+        with track_queries() as stats:
+            response = await self.get_response(request)
+        return self._report(request, response, stats)
+
+    def _report(self, request, response, stats):
+        for query, count in stats.repeated(self.threshold):
+            logger.warning("Возможный N+1 в %s %s: %d повторов", request.method, request.path, count, extra={
+                'method': request.method,
+                'path': request.path,
+                'count': count,
+                'query': query,
+            })
+
+        if settings.DEBUG:
+            response['X-DB-Queries'] = f'{stats.count}; {stats.duration * 1000:.1f}ms'
+        return response
+
+
+class MetricsMiddleware(_HybridMiddleware):
+    """Гистограмма длительности запросов по view, методу и коду ответа (см. projects.metrics)
+
+    Включается настройкой METRICS_ENABLED; заодно подключает хук
+    с метриками запросов к базе.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        db.add_query_hook(record_query_metrics)
+
+    def call(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        return self._observe(request, response, started)
+
+    async def acall(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        return self._observe(request, response, started)
+
+    def _observe(self, request, response, started):
+        match = getattr(request, 'resolver_match', None)
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            match.view_name if match else 'unmatched', request.method, response.status_code
+        )
+        return response
+
+
+# cProfile не допускает два активных профилировщика одновременно
+_profile_lock = threading.Lock()
+
+
+class ServerTimingMiddleware(_HybridMiddleware):
+    """Разбивка времени запроса по фазам и выборочное профилирование
+
+    SERVER_TIMING — заголовок Server-Timing с фазами session_load, db,
+    bcrypt, render, session_save; app — остальное время (логика view
+    и middleware), total — весь запрос.
+
+    PROFILE_SAMPLE_RATE — доля запросов, выполняемых под cProfile; если
+    такой запрос длился дольше PROFILE_THRESHOLD_MS, статистика
+    сохраняется в PROFILE_DIR (смотреть: python -m pstats файл.prof).
+    В асинхронной цепочке профилирование не включается: cProfile снимает
+    весь поток, то есть заодно и чужие корутины того же цикла событий.
+
+    Должен стоять первым в MIDDLEWARE, чтобы учитывать сохранение сессии.
+    """
+
+    def __init__(self, get_response):
+        self.server_timing = getattr(settings, 'SERVER_TIMING', False)
+        self.sample_rate = getattr(settings, 'PROFILE_SAMPLE_RATE', 0)
+        if not self.server_timing and not self.sample_rate:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.threshold = getattr(settings, 'PROFILE_THRESHOLD_MS', 500) / 1000
+        self.profile_dir = getattr(settings, 'PROFILE_DIR', None)
+        db.add_query_hook(record_query_time)
+
+    def call(self, request):
+        profiler = None
+        if self.sample_rate and random.random() < self.sample_rate and _profile_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+
+        started = time.perf_counter()
+        with collect_timings() as timings:
+            try:
+                if profiler:
+                    profiler.enable()
+                response = self.get_response(request)
+            finally:
+                if profiler:
+                    profiler.disable()
+                    _profile_lock.release()
+        total = time.perf_counter() - started
+
+        if profiler and total >= self.threshold:
+            self._dump(profiler, request, total)
+        if self.server_timing:
+            response['Server-Timing'] = timings.header(total)
+        return response
+
+    async def acall(self, request):
+        started = time.perf_counter()
+        with collect_timings() as timings:
+            response = await self.get_response(request)
+        if self.server_timing:
+            response['Server-Timing'] = timings.header(time.perf_counter() - started)
+        return response
+
+    def _dump(self, profiler, request, total):
+        if not self.profile_dir:
+            return
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            slug = re.sub(r'[^\w]+', '_', request.path).strip('_') or 'root'
+            filename = f'{time.strftime("%Y%m%d-%H%M%S")}_{request.method}_{slug}_{total * 1000:.0f}ms.prof'
+            profiler.dump_stats(os.path.join(self.profile_dir, filename))
+        except OSError as e:
+            logger.warning("Не удалось сохранить профиль запроса: %s", e)
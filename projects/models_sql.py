@@ -1,10 +1,178 @@
 # projects/models_sql.py
 
+from .cache import LRUCache
 from .database import db
+from .metrics import DONATIONS_CREATED, DONATIONS_USDT
+from .profiling import timed
 from datetime import datetime
 from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+import base64
+import binascii
 import bcrypt
+import json
+import os
 import re
+import threading
+import time
+
+# Горячие запросы регистрируются один раз и выполняются через PREPARE/EXECUTE
+USER_BY_ID = db.register_statement(
+    'user_by_id',
+    "SELECT * FROM users WHERE id = %s AND is_active = TRUE"
+)
+
+CATEGORY_ALL = db.register_statement(
+    'category_all',
+    "SELECT * FROM categories ORDER BY name"
+)
+
+PROJECT_BY_ID = db.register_statement('project_by_id', """
+    SELECT 
+        p.*, 
+        u.username as owner_username, 
+        u.avatar as owner_avatar,
+        (p.deadline - NOW()) AS days_left_interval
+    FROM projects p
+    JOIN users u ON p.owner_id = u.id
+    WHERE p.id = %s
+""")
+
+# Вставка пожертвования, увеличение collected_amount, пересчёт статуса проекта
+# и чтение результата с данными проекта и донора — одним запросом
+DONATION_CREATE = db.register_statement('donation_create', """
+    WITH inserted AS (
+        INSERT INTO donations (
+            project_id, donor_id, amount, amount_usdt_equivalent, currency,
+            email_receipt, bitpay_invoice_id, bitpay_status, is_anonymous, created_at
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        RETURNING *
+    ),
+    updated AS (
+        UPDATE projects p
+        SET collected_amount = p.collected_amount + i.amount_usdt_equivalent,
+            status = CASE 
+                WHEN p.collected_amount + i.amount_usdt_equivalent >= p.target_amount AND p.deadline > NOW() THEN 'success'
+                WHEN p.deadline <= NOW() AND p.collected_amount + i.amount_usdt_equivalent < p.target_amount THEN 'expired'
+                WHEN p.deadline > NOW() AND p.collected_amount + i.amount_usdt_equivalent < p.target_amount THEN 'active'
+                ELSE p.status
+            END
+        FROM inserted i
+        WHERE p.id = i.project_id
+        RETURNING p.id, p.title, p.image
+    )
+    SELECT 
+        i.*, 
+        up.title as project_title,
+        up.image as project_image,
+        CASE 
+            WHEN i.is_anonymous OR i.donor_id IS NULL THEN 'Аноним'
+            ELSE u.username 
+        END as donor_name,
+        u.avatar as donor_avatar
+    FROM inserted i
+    JOIN updated up ON up.id = i.project_id
+    LEFT JOIN users u ON i.donor_id = u.id
+""")
+
+def encode_page_token(row):
+    """Непрозрачный токен продолжения для keyset-пагинации по (created_at, id)"""
+    raw = json.dumps([row['created_at'].isoformat(), row['id']])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_page_token(token):
+    """Разбор токена продолжения в пару (created_at, id)"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError, binascii.Error):
+        raise ValueError("Некорректный токен страницы")
+
+
+def _keyset_page(rows, limit):
+    """Отделение лишней строки (limit + 1) и построение токена следующей страницы"""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_page_token(rows[-1])
+    return rows, None
+
+
+# Межзапросный кэш строк пользователей по ID. Сбрасывается в User.update/User.delete;
+# в других процессах запись живёт не дольше USER_CACHE_TTL секунд
+user_cache = LRUCache(
+    maxsize=int(os.getenv('USER_CACHE_SIZE', '10000')),
+    ttl=float(os.getenv('USER_CACHE_TTL', '60'))
+)
+
+
+def _user_cache_key(user_id):
+    try:
+        return int(user_id)
+    except (TypeError, ValueError):
+        return None
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Очередь хеширования паролей переполнена"""
+
+
+class PasswordHasher:
+    """Хеширование паролей bcrypt в ограниченном пуле потоков
+
+    rounds — стоимость bcrypt для новых хешей; хеши с другой стоимостью
+    пересчитываются при успешном входе. Одновременно считается не больше
+    max_workers хешей, ожидать своей очереди могут не больше max_pending
+    вызовов — остальные сразу получают PasswordHasherBusy, а не занимают
+    воркеры сервера.
+    """
+
+    def __init__(self, rounds=12, max_workers=2, max_pending=32, timeout=10.0):
+        if not 4 <= rounds <= 31:
+            raise ValueError("Стоимость bcrypt должна быть в диапазоне 4-31")
+        self.rounds = rounds
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='bcrypt')
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy("Слишком много одновременных операций с паролями, попробуйте позже")
+        try:
+            future = self._executor.submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        # Слот освобождается по завершении задачи, даже если вызывающий не дождался её
+        future.add_done_callback(lambda _: self._slots.release())
+        with timed('bcrypt'):
+            return future.result(timeout=self.timeout)
+
+    def hash(self, password):
+        """Хеш пароля с текущей стоимостью"""
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return self._run(bcrypt.hashpw, password.encode('utf-8'), salt).decode('utf-8')
+
+    def check(self, password, hashed):
+        """Проверка пароля по сохранённому хешу"""
+        return self._run(bcrypt.checkpw, password.encode('utf-8'), hashed.encode('utf-8'))
+
+    def needs_rehash(self, hashed):
+        """Хеш посчитан с другой стоимостью (формат $2b$<cost>$...)"""
+        try:
+            return int(hashed.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+
+password_hasher = PasswordHasher(
+    rounds=int(os.getenv('BCRYPT_ROUNDS', '12')),
+    max_workers=int(os.getenv('PASSWORD_HASH_WORKERS', str(max(1, (os.cpu_count() or 2) // 2)))),
+    max_pending=int(os.getenv('PASSWORD_HASH_MAX_PENDING', '32')),
+    timeout=float(os.getenv('PASSWORD_HASH_TIMEOUT', '10')),
+)
+
 
 class User:
     @staticmethod
@@ -14,7 +182,7 @@ class User:
         if len(password) < 8:
             raise ValueError("Пароль должен содержать минимум 8 символов")
         
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        hashed_password = password_hasher.hash(password)
         
         query = """
             INSERT INTO users (
@@ -38,10 +206,37 @@ class User:
     
     @staticmethod
     def get_by_id(user_id):
-        """Получение пользователя по ID"""
-        query = "SELECT * FROM users WHERE id = %s AND is_active = TRUE"
-        result = db.execute_query(query, (user_id,))
-        return result[0] if result else None
+        """Получение пользователя по ID (через кэш)"""
+        key = _user_cache_key(user_id)
+        if key is not None:
+            user = user_cache.get(key)
+            if user is not None:
+                return dict(user)
+        
+        result = db.execute_prepared(USER_BY_ID, (user_id,))
+        if not result:
+            return None
+        
+        if key is not None:
+            user_cache.set(key, dict(result[0]))
+        return result[0]
+    
+    @staticmethod
+    async def aget_by_id(user_id):
+        """Асинхронный вариант get_by_id (тот же кэш)"""
+        key = _user_cache_key(user_id)
+        if key is not None:
+            user = user_cache.get(key)
+            if user is not None:
+                return dict(user)
+        
+        result = await db.fetch_prepared(USER_BY_ID, (user_id,))
+        if not result:
+            return None
+        
+        if key is not None:
+            user_cache.set(key, dict(result[0]))
+        return result[0]
     
     @staticmethod
     def get_by_username(username):
@@ -71,12 +266,20 @@ class User:
             return None
         
         # Проверяем пароль
-        if bcrypt.checkpw(password.encode('utf-8'), user['password'].encode('utf-8')):
-            # Обновляем время последнего входа
-            db.execute_update(
-                "UPDATE users SET last_login = %s WHERE id = %s",
-                (datetime.now(), user['id'])
-            )
+        if password_hasher.check(password, user['password']):
+            # Обновляем время последнего входа и, если сменилась стоимость bcrypt, хеш пароля
+            if password_hasher.needs_rehash(user['password']):
+                user['password'] = password_hasher.hash(password)
+                db.execute_update(
+                    "UPDATE users SET last_login = %s, password = %s WHERE id = %s",
+                    (datetime.now(), user['password'], user['id'])
+                )
+            else:
+                db.execute_update(
+                    "UPDATE users SET last_login = %s WHERE id = %s",
+                    (datetime.now(), user['id'])
+                )
+            user_cache.delete(user['id'])
             return user
         return None
     
@@ -142,7 +345,7 @@ class User:
         if 'password' in kwargs and kwargs['password']:
             if len(kwargs['password']) < 8:
                 raise ValueError("Новый пароль должен содержать минимум 8 символов")
-            hashed_password = bcrypt.hashpw(kwargs['password'].encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+            hashed_password = password_hasher.hash(kwargs['password'])
             fields.append("password = %s")
             params.append(hashed_password)
         
@@ -151,35 +354,184 @@ class User:
         
         params.append(user_id)
         query = f"UPDATE users SET {', '.join(fields)} WHERE id = %s"
-        return db.execute_update(query, params) > 0
+        updated = db.execute_update(query, params) > 0
+        user_cache.delete(_user_cache_key(user_id))
+        return updated
     
     @staticmethod
     def delete(user_id):
         """Мягкое удаление пользователя (деактивация)"""
         query = "UPDATE users SET is_active = FALSE WHERE id = %s"
-        return db.execute_update(query, (user_id,)) > 0
+        deleted = db.execute_update(query, (user_id,)) > 0
+        user_cache.delete(_user_cache_key(user_id))
+        return deleted
+    
+    @staticmethod
+    def avatar_in_use(avatar, active_only=False):
+        """Записан ли этот URL аватара хоть у одного пользователя (файлы общие для одинаковых картинок)
+
+        active_only — не считать деактивированных (удаление профиля).
+        """
+        result = db.execute_query(
+            "SELECT 1 FROM users WHERE avatar = %s AND (is_active OR NOT %s) LIMIT 1",
+            (avatar, active_only)
+        )
+        return bool(result)
+
+
+class CategoryRegistry:
+    """Процессный реестр категорий с индексами по id и slug
+
+    Категории меняются крайне редко, поэтому загружаются одним запросом и
+    перечитываются не чаще, чем раз в ttl секунд (или после invalidate()).
+    Пока один поток перечитывает реестр, остальные читают прежние данные.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._ordered = []
+        self._by_id = {}
+        self._by_slug = {}
+        self._loaded_at = None
+
+    def _fresh(self):
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    def _ensure_loaded(self):
+        if self._fresh():
+            return
+        # Устаревший реестр перечитывает один поток, остальные отдают прежние данные;
+        # пустой реестр ждут все
+        stale = self._loaded_at is not None
+        if not self._lock.acquire(blocking=not stale):
+            return
+        try:
+            if not self._fresh():
+                self.reload()
+        finally:
+            self._lock.release()
+
+    async def aensure_loaded(self):
+        """Загрузка реестра без блокировки цикла событий (перед обращениями из async-кода)
+
+        Параллельные корутины могут перечитать реестр одновременно — это
+        безопасно, побеждает последний результат.
+        """
+        if not self._fresh():
+            self._replace(await db.fetch_prepared(CATEGORY_ALL))
+
+    def reload(self):
+        """Перечитывание категорий из базы"""
+        self._replace(db.execute_prepared(CATEGORY_ALL))
+
+    def _replace(self, rows):
+        # Индексы заменяются целиком, читатели не видят частично заполненных словарей
+        self._ordered = rows
+        self._by_id = {row['id']: row for row in rows}
+        self._by_slug = {row['slug']: row for row in rows}
+        self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        """Сброс реестра: следующее обращение перечитает категории"""
+        self._loaded_at = None
+
+    def all(self):
+        self._ensure_loaded()
+        return [dict(row) for row in self._ordered]
+
+    def get_by_id(self, category_id):
+        self._ensure_loaded()
+        row = self._by_id.get(category_id)
+        return dict(row) if row else None
+
+    def get_by_slug(self, slug):
+        self._ensure_loaded()
+        row = self._by_slug.get(slug)
+        return dict(row) if row else None
+
+
+category_registry = CategoryRegistry(ttl=int(os.getenv('CATEGORY_CACHE_TTL', '300')))
+
+
+def _attach_category(project):
+    """Добавление к проекту полей категории из реестра (вместо JOIN categories)"""
+    category = category_registry.get_by_id(project['category_id'])
+    if category is None:
+        # Категория добавлена после последней загрузки реестра
+        category_registry.invalidate()
+        category = category_registry.get_by_id(project['category_id'])
+    return _set_category(project, category or {})
+
+
+async def _aattach_category(project):
+    """Асинхронный вариант _attach_category"""
+    await category_registry.aensure_loaded()
+    category = category_registry.get_by_id(project['category_id'])
+    if category is None:
+        category_registry.invalidate()
+        await category_registry.aensure_loaded()
+        category = category_registry.get_by_id(project['category_id'])
+    return _set_category(project, category or {})
+
+
+def _set_category(project, category):
+    project['category_name'] = category.get('name')
+    project['category_slug'] = category.get('slug')
+    project['category_icon'] = category.get('icon')
+    return project
+
+
+FACET_COUNTS = "SELECT status, category_id, count FROM project_card_counts WHERE count > 0"
+
+PROJECT_VERSION = """
+    SELECT
+        updated_at,
+        GREATEST(0, DATE_PART('day', deadline - NOW()))::int AS days_left
+    FROM project_cards
+    WHERE id = %s
+"""
+
+# Статус проекта по собранной сумме и дедлайну (Project.update_status, откат пожертвования)
+PROJECT_STATUS_UPDATE = """
+    UPDATE projects 
+    SET status = CASE 
+        WHEN collected_amount >= target_amount AND deadline > NOW() THEN 'success'
+        WHEN deadline <= NOW() AND collected_amount < target_amount THEN 'expired'
+        WHEN deadline > NOW() AND collected_amount < target_amount THEN 'active'
+        ELSE status
+    END
+    WHERE id = %s
+"""
+
+# Длинные строки поиска обрезаются: разбор tsquery и ранжирование растут с числом лексем
+SEARCH_QUERY_MAX_LENGTH = 200
 
 
 class Category:
     @staticmethod
     def get_all():
         """Получение всех категорий"""
-        query = "SELECT * FROM categories ORDER BY name"
-        return db.execute_query(query)
+        return category_registry.all()
     
     @staticmethod
     def get_by_id(category_id):
         """Получение категории по ID"""
-        query = "SELECT * FROM categories WHERE id = %s"
-        result = db.execute_query(query, (category_id,))
-        return result[0] if result else None
+        try:
+            category_id = int(category_id)
+        except (TypeError, ValueError):
+            return None
+        return category_registry.get_by_id(category_id)
     
     @staticmethod
     def get_by_slug(slug):
         """Получение категории по слагу"""
-        query = "SELECT * FROM categories WHERE slug = %s"
-        result = db.execute_query(query, (slug,))
-        return result[0] if result else None
+        return category_registry.get_by_slug(slug)
+    
+    @staticmethod
+    async def aensure_loaded():
+        """Загрузка реестра категорий из async-кода: после неё get_* не обращаются к базе"""
+        await category_registry.aensure_loaded()
 
 
 class Project:
@@ -220,82 +572,180 @@ class Project:
     @staticmethod
     def get_by_id(project_id):
         """Получение проекта по ID с данными владельца и категории"""
-        query = """
-            SELECT 
-                p.*, 
-                u.username as owner_username, 
-                u.avatar as owner_avatar,
-                c.name as category_name,
-                c.slug as category_slug,
-                c.icon as category_icon,
-                (p.deadline - NOW()) AS days_left_interval
-            FROM projects p
-            JOIN users u ON p.owner_id = u.id
-            JOIN categories c ON p.category_id = c.id
-            WHERE p.id = %s
-        """
-        result = db.execute_query(query, (project_id,))
+        result = db.execute_prepared(PROJECT_BY_ID, (project_id,))
         if not result:
             return None
-        
-        project = result[0]
+        return _attach_category(Project._with_days_left(result[0]))
+    
+    @staticmethod
+    async def aget_by_id(project_id):
+        """Асинхронный вариант get_by_id"""
+        result = await db.fetch_prepared(PROJECT_BY_ID, (project_id,))
+        if not result:
+            return None
+        return await _aattach_category(Project._with_days_left(result[0]))
+    
+    @staticmethod
+    def _with_days_left(project):
         # Рассчитываем дни до дедлайна
         if project['days_left_interval']:
             project['days_left'] = max(0, project['days_left_interval'].days)
         else:
             project['days_left'] = 0
-        
         return project
     
     @staticmethod
-    def get_all(status=None, limit=20, offset=0):
-        """Получение списка проектов"""
+    def get_cards(status=None, limit=20, after=None, category_ids=None):
+        """Страница карточек проектов из модели чтения project_cards
+
+        Один индексный проход без JOIN; модель поддерживается триггерами
+        (см. projects/sql/migrations/0003_project_cards.sql). category_ids — фильтр по
+        категориям. Возвращает (карточки, токен).
+        """
+        query, params = Project._cards_query(status, limit, after, category_ids)
+        return _keyset_page(db.execute_query(query, params), limit)
+
+    @staticmethod
+    async def aget_cards(status=None, limit=20, after=None, category_ids=None):
+        """Асинхронный вариант get_cards"""
+        query, params = Project._cards_query(status, limit, after, category_ids)
+        return _keyset_page(await db.fetch(query, params), limit)
+
+    @staticmethod
+    def _cards_query(status, limit, after, category_ids):
         query = """
             SELECT 
-                p.*, 
-                u.username as owner_username, 
-                u.avatar as owner_avatar,
-                c.name as category_name,
-                c.slug as category_slug,
-                c.icon as category_icon,
-                (p.deadline - NOW()) AS days_left_interval
-            FROM projects p
-            JOIN users u ON p.owner_id = u.id
-            JOIN categories c ON p.category_id = c.id
-            WHERE p.status != 'draft'
+                *,
+                GREATEST(0, DATE_PART('day', deadline - NOW()))::int AS days_left
+            FROM project_cards
+            WHERE TRUE
         """
         params = []
         
         if status:
-            query += " AND p.status = %s"
+            query += " AND status = %s"
             params.append(status)
         
-        query += " ORDER BY p.created_at DESC LIMIT %s OFFSET %s"
-        params.extend([limit, offset])
+        if category_ids:
+            query += " AND category_id = ANY(%s)"
+            params.append(list(category_ids))
         
-        results = db.execute_query(query, params)
+        if after:
+            query += " AND (created_at, id) < (%s, %s)"
+            params.extend(decode_page_token(after))
         
-        # Нормализуем дни до дедлайна
-        for project in results:
-            if project['days_left_interval']:
-                project['days_left'] = max(0, project['days_left_interval'].days)
-            else:
-                project['days_left'] = 0
+        query += " ORDER BY created_at DESC, id DESC LIMIT %s"
+        params.append(limit + 1)
+        return query, params
+
+    @staticmethod
+    def get_facets(status=None, category_ids=None):
+        """Счётчики карточек для фасетного фильтра
+
+        Читаются из project_card_counts (одна маленькая таблица, которую
+        ведут триггеры). Счётчики категорий учитывают выбранный статус,
+        счётчики статусов — выбранные категории. Возвращает
+        {'statuses': {статус: число, 'all': число},
+         'categories': [категория + 'count' + 'selected', ...]}.
+        """
+        return Project._count_facets(db.execute_query(FACET_COUNTS), status, category_ids)
+
+    @staticmethod
+    async def aget_facets(status=None, category_ids=None):
+        """Асинхронный вариант get_facets"""
+        rows = await db.fetch(FACET_COUNTS)
+        await category_registry.aensure_loaded()
+        return Project._count_facets(rows, status, category_ids)
+
+    @staticmethod
+    def _count_facets(rows, status, category_ids):
+        selected = set(category_ids or [])
         
-        return results
-    
+        statuses = {'all': 0}
+        by_category = {}
+        for row in rows:
+            if not selected or row['category_id'] in selected:
+                statuses[row['status']] = statuses.get(row['status'], 0) + row['count']
+                statuses['all'] += row['count']
+            if not status or row['status'] == status:
+                by_category[row['category_id']] = by_category.get(row['category_id'], 0) + row['count']
+        
+        categories = [
+            dict(category, count=by_category.get(category['id'], 0), selected=category['id'] in selected)
+            for category in Category.get_all()
+        ]
+        return {'statuses': statuses, 'categories': categories}
+
+    @staticmethod
+    def search(query, status=None, limit=20, offset=0):
+        """Полнотекстовый поиск по названию, слогану и описанию
+
+        Использует projects.search_vector и GIN-индекс
+        (см. миграции 0004_project_search и 0007_project_search_index); запрос
+        разбирается websearch_to_tsquery в русской и английской конфигурациях.
+        Результаты — карточки project_cards (без черновиков), отсортированные
+        по релевантности. Возвращает (карточки, есть_ли_ещё).
+        """
+        query = (query or '').strip()[:SEARCH_QUERY_MAX_LENGTH]
+        if not query:
+            return [], False
+
+        sql = """
+            WITH q AS (
+                SELECT websearch_to_tsquery('russian', %s) || websearch_to_tsquery('english', %s) AS query
+            )
+            SELECT
+                pc.*,
+                GREATEST(0, DATE_PART('day', pc.deadline - NOW()))::int AS days_left,
+                ts_rank_cd(p.search_vector, q.query) AS rank
+            FROM q, projects p
+            JOIN project_cards pc ON pc.id = p.id
+            WHERE p.search_vector @@ q.query
+        """
+        params = [query, query]
+
+        if status:
+            sql += " AND pc.status = %s"
+            params.append(status)
+
+        sql += " ORDER BY rank DESC, pc.id DESC LIMIT %s OFFSET %s"
+        params.extend([limit + 1, offset])
+
+        results = db.execute_query(sql, params)
+        return results[:limit], len(results) > limit
+
+    @staticmethod
+    def get_version(project_id):
+        """Версия проекта для условного GET: (updated_at, days_left) или None
+
+        Берётся из project_cards: триггеры обновляют updated_at при любом
+        изменении проекта, его автора или категории, а каждое пожертвование
+        меняет собранную сумму. Черновиков в project_cards нет — для них None.
+        """
+        result = db.execute_query(PROJECT_VERSION, (project_id,))
+        if not result:
+            return None
+        return result[0]['updated_at'], result[0]['days_left']
+
+    @staticmethod
+    async def aget_version(project_id):
+        """Асинхронный вариант get_version"""
+        row = await db.fetchrow(PROJECT_VERSION, (project_id,))
+        return (row['updated_at'], row['days_left']) if row else None
+
     @staticmethod
     def get_by_owner(owner_id, status=None):
-        """Получение проектов пользователя"""
+        """Получение проектов пользователя
+
+        Выборка читается целиком, не через iter_query: вызывающие либо
+        считают длину списка, либо удаляют проекты по ходу — при потоковом
+        чтении каждое удаление занимало бы второе соединение из пула.
+        """
         query = """
             SELECT 
                 p.*, 
-                c.name as category_name,
-                c.slug as category_slug,
-                c.icon as category_icon,
                 (p.deadline - NOW()) AS days_left_interval
             FROM projects p
-            JOIN categories c ON p.category_id = c.id
             WHERE p.owner_id = %s
         """
         params = [owner_id]
@@ -308,12 +758,10 @@ class Project:
         
         results = db.execute_query(query, params)
         
-        # Нормализуем дни до дедлайна
+        # Категории добавляются после выборки: перечитывание реестра
+        # не должно ждать второго соединения из пула
         for project in results:
-            if project['days_left_interval']:
-                project['days_left'] = max(0, project['days_left_interval'].days)
-            else:
-                project['days_left'] = 0
+            _attach_category(Project._with_days_left(project))
         
         return results
     
@@ -380,17 +828,7 @@ class Project:
     @staticmethod
     def update_status(project_id):
         """Обновление статуса проекта на основе текущих данных"""
-        query = """
-            UPDATE projects 
-            SET status = CASE 
-                WHEN collected_amount >= target_amount AND deadline > NOW() THEN 'success'
-                WHEN deadline <= NOW() AND collected_amount < target_amount THEN 'expired'
-                WHEN deadline > NOW() AND collected_amount < target_amount THEN 'active'
-                ELSE status
-            END
-            WHERE id = %s
-        """
-        return db.execute_update(query, (project_id,))
+        return db.execute_update(PROJECT_STATUS_UPDATE, (project_id,))
     
     @staticmethod
     def delete(project_id):
@@ -401,10 +839,10 @@ class Project:
 
 class Donation:
     @staticmethod
-    def create(project_id, amount, currency, amount_usdt_equivalent, 
-               donor_id=None, email_receipt='', bitpay_invoice_id=None, 
-               bitpay_status='pending', is_anonymous=False):
-        """Создание нового пожертвования"""
+    def _prepare_row(project_id, amount, currency, amount_usdt_equivalent, 
+                     donor_id=None, email_receipt='', bitpay_invoice_id=None, 
+                     bitpay_status='pending', is_anonymous=False, created_at=None):
+        """Валидация данных пожертвования и подготовка строки для вставки"""
         # Валидация суммы
         amount_dec = Decimal(amount)
         usdt_dec = Decimal(amount_usdt_equivalent)
@@ -420,27 +858,84 @@ class Donation:
         if currency not in valid_currencies:
             raise ValueError(f"Неверная валюта. Допустимые значения: {', '.join(valid_currencies)}")
         
-        query = """
-            INSERT INTO donations (
-                project_id, donor_id, amount, amount_usdt_equivalent, currency,
-                email_receipt, bitpay_invoice_id, bitpay_status, is_anonymous, created_at
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            RETURNING id
-        """
-        
-        params = (
+        return (
             project_id, donor_id, amount_dec, usdt_dec, currency,
-            email_receipt, bitpay_invoice_id, bitpay_status, is_anonymous, datetime.now()
+            email_receipt, bitpay_invoice_id, bitpay_status, is_anonymous,
+            created_at or datetime.now()
+        )
+    
+    @staticmethod
+    def create(project_id, amount, currency, amount_usdt_equivalent, 
+               donor_id=None, email_receipt='', bitpay_invoice_id=None, 
+               bitpay_status='pending', is_anonymous=False):
+        """Создание нового пожертвования
+
+        Вставка, обновление собранной суммы и статуса проекта и чтение
+        созданной записи выполняются одним запросом в одной транзакции.
+        """
+        params = Donation._prepare_row(
+            project_id, amount, currency, amount_usdt_equivalent,
+            donor_id, email_receipt, bitpay_invoice_id, bitpay_status, is_anonymous
         )
         
-        result = db.execute_query(query, params)
-        donation_id = result[0]['id']
+        result = db.execute_prepared(DONATION_CREATE, params)
+        if not result:
+            return None
+        DONATIONS_CREATED.inc('single')
+        DONATIONS_USDT.inc('single', amount=float(result[0]['amount_usdt_equivalent']))
+        return result[0]
+    
+    @staticmethod
+    def bulk_create(donations, page_size=1000):
+        """Массовое создание пожертвований (импорт истории платежей, выгрузки BitPay)
+
+        donations — итерируемый объект словарей с полями как у create()
+        (плюс необязательный created_at). Каждая страница из page_size строк
+        вставляется одним запросом, который тут же добавляет суммы к
+        collected_amount затронутых проектов и пересчитывает их статус.
+        Всё выполняется в одной транзакции. Возвращает число вставленных строк.
+        """
+        query = """
+            WITH inserted AS (
+                INSERT INTO donations (
+                    project_id, donor_id, amount, amount_usdt_equivalent, currency,
+                    email_receipt, bitpay_invoice_id, bitpay_status, is_anonymous, created_at
+                ) VALUES %s
+                RETURNING project_id, amount_usdt_equivalent
+            ),
+            totals AS (
+                SELECT project_id, SUM(amount_usdt_equivalent) AS total
+                FROM inserted
+                GROUP BY project_id
+            ),
+            updated AS (
+                UPDATE projects p
+                SET collected_amount = p.collected_amount + t.total,
+                    status = CASE 
+                        WHEN p.collected_amount + t.total >= p.target_amount AND p.deadline > NOW() THEN 'success'
+                        WHEN p.deadline <= NOW() AND p.collected_amount + t.total < p.target_amount THEN 'expired'
+                        WHEN p.deadline > NOW() AND p.collected_amount + t.total < p.target_amount THEN 'active'
+                        ELSE p.status
+                    END
+                FROM totals t
+                WHERE p.id = t.project_id
+            )
+            SELECT COUNT(*) AS inserted FROM inserted
+        """
+        usdt_total = Decimal('0')
         
-        # Обновляем собранную сумму проекта
-        Project.update_collected_amount(project_id, usdt_dec)
-        Project.update_status(project_id)
+        def rows():
+            nonlocal usdt_total
+            for donation in donations:
+                row = Donation._prepare_row(**donation)
+                usdt_total += row[3]  # amount_usdt_equivalent
+                yield row
         
-        return Donation.get_by_id(donation_id)
+        result = db.execute_values(query, rows(), page_size=page_size, fetch=True)
+        inserted = sum(page['inserted'] for page in result)
+        DONATIONS_CREATED.inc('bulk', amount=inserted)
+        DONATIONS_USDT.inc('bulk', amount=float(usdt_total))
+        return inserted
     
     @staticmethod
     def get_by_id(donation_id):
@@ -464,8 +959,61 @@ class Donation:
         return result[0] if result else None
     
     @staticmethod
-    def get_by_project(project_id, limit=50, offset=0):
-        """Получение пожертвований проекта"""
+    def get_by_donor(donor_id, limit=50, offset=0):
+        """Получение пожертвований пользователя"""
+        query = """
+            SELECT 
+                d.*, 
+                p.title as project_title,
+                p.image as project_image,
+                p.owner_id as project_owner_id
+            FROM donations d
+            JOIN projects p ON d.project_id = p.id
+            WHERE d.donor_id = %s AND d.is_anonymous = FALSE
+            ORDER BY d.created_at DESC
+            LIMIT %s OFFSET %s
+        """
+        return db.execute_query(query, (donor_id, limit, offset))
+    
+    @staticmethod
+    def get_page_by_project(project_id, limit=50, after=None):
+        """Страница пожертвований проекта с keyset-пагинацией: (пожертвования, токен)"""
+        query, params = Donation._page_by_project_query(project_id, limit, after)
+        return _keyset_page(db.execute_query(query, params), limit)
+    
+    @staticmethod
+    async def aget_page_by_project(project_id, limit=50, after=None):
+        """Асинхронный вариант get_page_by_project"""
+        query, params = Donation._page_by_project_query(project_id, limit, after)
+        return _keyset_page(await db.fetch(query, params), limit)
+    
+    @staticmethod
+    def _page_by_project_query(project_id, limit, after):
+        query = """
+            SELECT 
+                d.*,
+                CASE 
+                    WHEN d.is_anonymous OR d.donor_id IS NULL THEN 'Аноним'
+                    ELSE u.username 
+                END as donor_name,
+                u.avatar as donor_avatar
+            FROM donations d
+            LEFT JOIN users u ON d.donor_id = u.id
+            WHERE d.project_id = %s
+        """
+        params = [project_id]
+        
+        if after:
+            query += " AND (d.created_at, d.id) < (%s, %s)"
+            params.extend(decode_page_token(after))
+        
+        query += " ORDER BY d.created_at DESC, d.id DESC LIMIT %s"
+        params.append(limit + 1)
+        return query, params
+    
+    @staticmethod
+    def iter_by_project(project_id, batch_size=1000):
+        """Потоковое получение всех пожертвований проекта (для выгрузок)"""
         query = """
             SELECT 
                 d.*,
@@ -478,13 +1026,12 @@ class Donation:
             LEFT JOIN users u ON d.donor_id = u.id
             WHERE d.project_id = %s
             ORDER BY d.created_at DESC
-            LIMIT %s OFFSET %s
         """
-        return db.execute_query(query, (project_id, limit, offset))
+        return db.iter_query(query, (project_id,), batch_size=batch_size)
     
     @staticmethod
-    def get_by_donor(donor_id, limit=50, offset=0):
-        """Получение пожертвований пользователя"""
+    def iter_by_donor(donor_id, batch_size=1000):
+        """Потоковое получение всех пожертвований пользователя (для выгрузок)"""
         query = """
             SELECT 
                 d.*, 
@@ -495,9 +1042,8 @@ class Donation:
             JOIN projects p ON d.project_id = p.id
             WHERE d.donor_id = %s AND d.is_anonymous = FALSE
             ORDER BY d.created_at DESC
-            LIMIT %s OFFSET %s
         """
-        return db.execute_query(query, (donor_id, limit, offset))
+        return db.iter_query(query, (donor_id,), batch_size=batch_size)
     
     @staticmethod
     def update_bitpay_status(donation_id, status):
@@ -506,25 +1052,37 @@ class Donation:
         if status not in valid_statuses:
             raise ValueError(f"Неверный статус BitPay. Допустимые значения: {', '.join(valid_statuses)}")
         
-        query = "UPDATE donations SET bitpay_status = %s WHERE id = %s"
+        # У откаченного пожертвования остаётся статус, по которому его откатили
+        query = "UPDATE donations SET bitpay_status = %s WHERE id = %s AND rolled_back_at IS NULL"
         return db.execute_update(query, (status, donation_id)) > 0
     
     @staticmethod
     def rollback_donation(donation_id):
-        """Откат пожертвования при неудачной оплате"""
-        donation = Donation.get_by_id(donation_id)
-        if not donation:
-            return False
-        
-        # Уменьшаем собранную сумму проекта
-        query = """
-            UPDATE projects 
-            SET collected_amount = GREATEST(0, collected_amount - %s) 
-            WHERE id = %s
+        """Откат пожертвования при неудачной оплате
+
+        rolled_back_at ставится той же транзакцией, что уменьшает сумму
+        проекта, поэтому откат выполняется не больше одного раза — повторный
+        вызов (задача donations.rollback, повторный вебхук) ничего не меняет
+        и возвращает False. bitpay_status не трогается.
         """
-        db.execute_update(query, (donation['amount_usdt_equivalent'], donation['project_id']))
-        
-        # Обновляем статус проекта
-        Project.update_status(donation['project_id'])
+        with db.get_cursor() as cursor:
+            cursor.execute("""
+                UPDATE donations SET rolled_back_at = NOW()
+                WHERE id = %s AND rolled_back_at IS NULL
+                RETURNING project_id, amount_usdt_equivalent
+            """, (donation_id,))
+            donation = cursor.fetchone()
+            if donation is None:
+                return False
+            
+            # Уменьшаем собранную сумму проекта
+            cursor.execute("""
+                UPDATE projects 
+                SET collected_amount = GREATEST(0, collected_amount - %s) 
+                WHERE id = %s
+            """, (donation['amount_usdt_equivalent'], donation['project_id']))
+            
+            # Обновляем статус проекта
+            cursor.execute(PROJECT_STATUS_UPDATE, (donation['project_id'],))
         
         return True
\ No newline at end of file
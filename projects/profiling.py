@@ -0,0 +1,88 @@
+# projects/profiling.py
+#
+# Разбивка времени HTTP-запроса по фазам для заголовка Server-Timing
+# (см. projects.middleware.ServerTimingMiddleware).
+#
+# Фазы отмечаются через timed('имя'); время запросов к БД приходит из хука
+# record_query_time. Вне collect_timings() всё это почти ничего не стоит:
+# одно чтение ContextVar.
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+import time
+
+from django.shortcuts import render as django_render
+
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Суммарное время и число вызовов по фазам одного запроса
+
+    Фазы могут вкладываться (запрос к БД внутри загрузки сессии);
+    exclusive — время только верхнеуровневых фаз, чтобы остаток
+    («app») не вычитал одно и то же дважды.
+    """
+
+    def __init__(self):
+        self.phases = {}  # имя -> [секунды, число вызовов]
+        self.exclusive = 0.0
+        self.depth = 0
+
+    def add(self, name, duration, top_level=True):
+        phase = self.phases.setdefault(name, [0.0, 0])
+        phase[0] += duration
+        phase[1] += 1
+        if top_level:
+            self.exclusive += duration
+
+    def header(self, total):
+        """Значение заголовка Server-Timing (длительности в миллисекундах)"""
+        parts = [
+            f'{name};dur={duration * 1000:.1f};desc="{count}×"'
+            for name, (duration, count) in self.phases.items()
+        ]
+        parts.append(f'app;dur={max(0.0, total - self.exclusive) * 1000:.1f}')
+        parts.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(parts)
+
+
+@contextmanager
+def collect_timings():
+    """Сбор фаз внутри блока (один HTTP-запрос)"""
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def timed(name):
+    """Учёт времени блока как фазы name текущего запроса"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    top_level = timings.depth == 0
+    timings.depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.depth -= 1
+        timings.add(name, time.perf_counter() - started, top_level)
+
+
+def record_query_time(event):
+    """Хук Database: время запроса — в фазу db"""
+    timings = _current.get()
+    if timings is not None:
+        timings.add('db', event.duration, timings.depth == 0)
+
+
+def render(request, template_name, context=None, *args, **kwargs):
+    """django.shortcuts.render с учётом времени в фазе render"""
+    with timed('render'):
+        return django_render(request, template_name, context, *args, **kwargs)
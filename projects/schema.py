@@ -0,0 +1,193 @@
+# projects/schema.py
+#
+# Версионированные SQL-миграции для таблиц, с которыми работает models_sql.py
+# (Django ORM и его миграции здесь не используются).
+#
+# Файлы лежат в projects/sql/migrations и называются NNNN_описание.sql;
+# применяются по возрастанию номера, каждый — один раз. Применённые версии
+# и контрольные суммы файлов хранятся в таблице schema_migrations.
+#
+# Обычная миграция выполняется в одной транзакции целиком. Файл, первая
+# строка которого «-- migrate: no-transaction», выполняется вне транзакции
+# по одной команде — так строятся индексы CREATE INDEX CONCURRENTLY.
+# В таких файлах команды разделяются «;» в конце строки, тела функций
+# ($$ ... $$) в них не допускаются.
+
+import hashlib
+import os
+import re
+
+from psycopg2 import sql
+
+from .database import db
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sql', 'migrations')
+
+NO_TRANSACTION_MARK = '-- migrate: no-transaction'
+
+# Ключ pg_advisory_lock: два процесса не применяют миграции одновременно
+LOCK_KEY = 0x5354414b  # 'STAK'
+
+MIGRATIONS_TABLE_DDL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        checksum CHAR(64) NOT NULL,
+        applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    )
+"""
+
+_FILENAME_RE = re.compile(r'^(\d{4})_(\w+)\.sql$')
+_CONCURRENT_INDEX_RE = re.compile(
+    r'CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)',
+    re.IGNORECASE
+)
+
+
+class MigrationError(Exception):
+    """Ошибка набора миграций или их применения"""
+
+
+class Migration:
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+        with open(path, encoding='utf-8') as f:
+            self.sql = f.read()
+        self.checksum = hashlib.sha256(self.sql.encode('utf-8')).hexdigest()
+        self.transactional = not self.sql.lstrip().startswith(NO_TRANSACTION_MARK)
+
+    def __repr__(self):
+        return f'{self.version:04d}_{self.name}'
+
+    def statements(self):
+        """Команды файла по отдельности (для миграций вне транзакции)"""
+        for chunk in re.split(r';\s*$', self.sql, flags=re.MULTILINE):
+            lines = [line for line in chunk.splitlines() if line.strip() and not line.strip().startswith('--')]
+            if lines:
+                yield '\n'.join(lines)
+
+    def concurrent_indexes(self):
+        """Имена индексов, которые миграция строит CONCURRENTLY"""
+        return _CONCURRENT_INDEX_RE.findall(self.sql)
+
+
+def discover(directory=MIGRATIONS_DIR):
+    """Миграции каталога по возрастанию версии"""
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.sql'):
+            continue
+        match = _FILENAME_RE.match(filename)
+        if not match:
+            raise MigrationError(f"Некорректное имя файла миграции: {filename}")
+        migrations.append(Migration(int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise MigrationError("Повторяющиеся номера миграций")
+    return migrations
+
+
+class MigrationRunner:
+    """Применение миграций из каталога к базе db"""
+
+    def __init__(self, database=db, directory=MIGRATIONS_DIR):
+        self.db = database
+        self.migrations = discover(directory)
+
+    def applied(self):
+        """Применённые миграции: {версия: строка schema_migrations}"""
+        self.db.execute_update(MIGRATIONS_TABLE_DDL)
+        rows = self.db.execute_query("SELECT version, name, checksum, applied_at FROM schema_migrations")
+        return {row['version']: row for row in rows}
+
+    def status(self):
+        """Список (миграция, строка schema_migrations или None) для всех файлов"""
+        applied = self.applied()
+        return [(m, applied.get(m.version)) for m in self.migrations]
+
+    def changed(self):
+        """Применённые миграции, файлы которых изменились после применения"""
+        return [m for m, row in self.status() if row and row['checksum'].strip() != m.checksum]
+
+    def pending(self):
+        """Ещё не применённые миграции"""
+        return [m for m, row in self.status() if row is None]
+
+    def migrate(self, target=None, fake=False, log=print):
+        """Применение ожидающих миграций (до версии target включительно)
+
+        fake — только отметить миграции применёнными, не выполняя SQL
+        (для баз, где схема уже совпадает с файлами). Возвращает список
+        применённых миграций.
+        """
+        done = []
+        with self.db.autocommit_cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_lock(%s)", (LOCK_KEY,))
+            try:
+                cursor.execute(MIGRATIONS_TABLE_DDL)
+                cursor.execute("SELECT version FROM schema_migrations")
+                applied = {row['version'] for row in cursor.fetchall()}
+
+                for migration in self.migrations:
+                    if migration.version in applied:
+                        continue
+                    if target is not None and migration.version > target:
+                        break
+                    log(f"⏳ {migration}{' (fake)' if fake else ''}")
+                    if fake:
+                        self._record(cursor, migration)
+                    elif migration.transactional:
+                        self._apply_in_transaction(cursor, migration)
+                    else:
+                        self._apply_statements(cursor, migration)
+                    done.append(migration)
+            finally:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", (LOCK_KEY,))
+        return done
+
+    def _record(self, cursor, migration):
+        cursor.execute(
+            "INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+            (migration.version, migration.name, migration.checksum)
+        )
+
+    def _apply_in_transaction(self, cursor, migration):
+        cursor.execute("BEGIN")
+        try:
+            cursor.execute(migration.sql)
+            self._record(cursor, migration)
+            cursor.execute("COMMIT")
+        except Exception as e:
+            cursor.execute("ROLLBACK")
+            raise MigrationError(f"{migration}: {e}") from e
+
+    def _apply_statements(self, cursor, migration):
+        for statement in migration.statements():
+            try:
+                cursor.execute(statement)
+            except Exception as e:
+                self._drop_invalid_indexes(cursor, migration)
+                raise MigrationError(f"{migration}: {e}") from e
+        self._record(cursor, migration)
+
+    def _drop_invalid_indexes(self, cursor, migration):
+        """Удаление индексов, оставшихся INVALID после прерванного CREATE INDEX CONCURRENTLY
+
+        Иначе при повторном запуске IF NOT EXISTS пропустит такой индекс,
+        и он так и останется неиспользуемым.
+        """
+        names = migration.concurrent_indexes()
+        if not names:
+            return
+        cursor.execute("""
+            SELECT c.relname
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE NOT i.indisvalid AND n.nspname = current_schema() AND c.relname = ANY(%s)
+        """, (names,))
+        for row in cursor.fetchall():
+            cursor.execute(sql.SQL("DROP INDEX CONCURRENTLY IF EXISTS {}").format(sql.Identifier(row['relname'])))
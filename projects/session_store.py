@@ -0,0 +1,248 @@
+# projects/session_store.py
+#
+# Хранилище сессий Django в UNLOGGED-таблице PostgreSQL.
+# Подключение: SESSION_ENGINE = 'projects.session_store'
+#
+# UNLOGGED-таблица не пишется в WAL, поэтому запись заметно дешевле обычной;
+# цена — после аварийного перезапуска PostgreSQL таблица очищается
+# (пользователям придётся войти заново). Таблица создаётся миграцией
+# projects/sql/migrations/0002_web_sessions.sql (manage.py migrate_sql).
+
+import copy
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.sessions.backends.base import CreateError, SessionBase, UpdateError
+from django.utils import timezone
+
+from .cache import LRUCache
+from .database import db
+from .metrics import SESSION_SECONDS
+from .profiling import timed
+
+# Кэш прочитанных сессий: ключ -> (session_data, expire_date, version).
+# Короткий TTL ограничивает время, в течение которого другой процесс может
+# видеть устаревшую или уже удалённую (например, после выхода) сессию.
+# Запись из устаревшей копии не теряет чужих изменений: UPDATE сверяет
+# version, а при расхождении изменения запроса переносятся на свежие данные.
+session_cache = LRUCache(
+    maxsize=getattr(settings, 'SESSION_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'SESSION_CACHE_TTL', 5),
+)
+
+SESSION_SELECT = (
+    "SELECT session_data, expire_date, version FROM web_sessions "
+    "WHERE session_key = %s AND expire_date > NOW()"
+)
+
+# Сколько раз save() переносит изменения на свежую версию сессии, прежде чем сдаться
+SAVE_ATTEMPTS = 3
+
+_sweep_lock = threading.Lock()
+_last_sweep = time.monotonic()
+
+
+def _maybe_sweep():
+    """Фоновая очистка просроченных сессий не чаще SESSION_SWEEP_INTERVAL секунд"""
+    global _last_sweep
+    interval = getattr(settings, 'SESSION_SWEEP_INTERVAL', 3600)
+    if not interval or time.monotonic() - _last_sweep < interval:
+        return
+    if not _sweep_lock.acquire(blocking=False):
+        return
+    try:
+        if time.monotonic() - _last_sweep < interval:
+            return
+        _last_sweep = time.monotonic()
+    finally:
+        _sweep_lock.release()
+    threading.Thread(target=SessionStore.clear_expired, name='session-sweeper', daemon=True).start()
+
+
+class SessionStore(SessionBase):
+    """Сессии в PostgreSQL с процессным кэшем чтения
+
+    Строка перезаписывается только если данные сессии изменились или
+    срок жизни в базе прошёл больше чем наполовину.
+    """
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._stored_data = None    # данные сессии на момент загрузки
+        self._stored_expiry = None  # expire_date строки в базе
+        self._stored_version = None  # version строки в базе
+
+    def _fetch(self, session_key):
+        """Чтение (session_data, expire_date, version) из кэша или базы"""
+        cached = session_cache.get(session_key)
+        if cached is not None:
+            return cached
+        return self._cache_row(session_key, db.execute_query(SESSION_SELECT, (session_key,)))
+
+    async def _afetch(self, session_key):
+        """Асинхронный вариант _fetch"""
+        cached = session_cache.get(session_key)
+        if cached is not None:
+            return cached
+        return self._cache_row(session_key, await db.fetch(SESSION_SELECT, (session_key,)))
+
+    def _cache_row(self, session_key, result):
+        if not result:
+            return None
+        row = (result[0]['session_data'], result[0]['expire_date'], result[0]['version'])
+        session_cache.set(session_key, row)
+        return row
+
+    def load(self):
+        started = time.perf_counter()
+        with timed('session_load'):
+            data = self._load()
+        SESSION_SECONDS.observe(time.perf_counter() - started, 'load')
+        return data
+
+    async def aensure_loaded(self):
+        """Загрузка сессии без блокировки цикла событий (для async-view)
+
+        После неё обращения к request.session берут данные из памяти,
+        а не вызывают синхронный load().
+        """
+        if hasattr(self, '_session_cache'):
+            return
+        started = time.perf_counter()
+        with timed('session_load'):
+            row = await self._afetch(self.session_key) if self.session_key else None
+            self._session_cache = self._from_row(row)
+        SESSION_SECONDS.observe(time.perf_counter() - started, 'load')
+
+    def _load(self):
+        return self._from_row(self._fetch(self.session_key) if self.session_key else None)
+
+    def _from_row(self, row):
+        if row is None or row[1] <= timezone.now():
+            self._session_key = None
+            return {}
+        data = self.decode(row[0])
+        self._stored_data = copy.deepcopy(data)
+        self._stored_expiry = row[1]
+        self._stored_version = row[2]
+        return data
+
+    def exists(self, session_key):
+        if session_cache.get(session_key) is not None:
+            return True
+        return bool(db.execute_query(
+            "SELECT 1 FROM web_sessions WHERE session_key = %s", (session_key,)
+        ))
+
+    def create(self):
+        while True:
+            self._session_key = self._get_new_session_key()
+            try:
+                # Сохраняем сразу, чтобы гарантировать уникальность ключа
+                self.save(must_create=True)
+            except CreateError:
+                continue
+            self.modified = True
+            return
+
+    def _unchanged(self, data):
+        """Данные не менялись, а срок жизни в базе ещё не требует продления"""
+        if self._stored_data is None or data != self._stored_data:
+            return False
+        remaining = self._stored_expiry - timezone.now()
+        return remaining > timedelta(seconds=self.get_expiry_age() / 2)
+
+    def save(self, must_create=False):
+        started = time.perf_counter()
+        with timed('session_save'):
+            self._save(must_create)
+        SESSION_SECONDS.observe(time.perf_counter() - started, 'save')
+
+    def _save(self, must_create):
+        if self.session_key is None:
+            return self.create()
+
+        data = self._get_session(no_load=must_create)
+        if not must_create and self._unchanged(data):
+            return
+
+        session_data = self.encode(data)
+        expire_date = self.get_expiry_date()
+
+        if must_create:
+            result = db.execute_query(
+                "INSERT INTO web_sessions (session_key, session_data, expire_date) "
+                "VALUES (%s, %s, %s) ON CONFLICT (session_key) DO NOTHING RETURNING version",
+                (self.session_key, session_data, expire_date)
+            )
+            if not result:
+                raise CreateError
+        else:
+            changed, removed = self._changes(data)
+            for _ in range(SAVE_ATTEMPTS):
+                result = db.execute_query(
+                    "UPDATE web_sessions SET session_data = %s, expire_date = %s, version = version + 1 "
+                    "WHERE session_key = %s AND version = %s RETURNING version",
+                    (session_data, expire_date, self.session_key, self._stored_version)
+                )
+                if result:
+                    break
+                # Сессию изменил другой процесс (или её уже нет): перечитываем мимо кэша
+                session_cache.delete(self.session_key)
+                fresh = db.execute_query(SESSION_SELECT, (self.session_key,))
+                if not fresh:
+                    raise UpdateError
+                data = self._rebase(fresh[0], changed, removed)
+                session_data = self.encode(data)
+            else:
+                raise UpdateError
+
+        version = result[0]['version']
+        session_cache.set(self.session_key, (session_data, expire_date, version))
+        self._stored_data = copy.deepcopy(data)
+        self._stored_expiry = expire_date
+        self._stored_version = version
+        _maybe_sweep()
+
+    def _changes(self, data):
+        """Изменения этого запроса относительно загруженных данных: (изменённые ключи, удалённые ключи)"""
+        base = self._stored_data or {}
+        changed = {key: value for key, value in data.items() if key not in base or base[key] != value}
+        return changed, base.keys() - data.keys()
+
+    def _rebase(self, row, changed, removed):
+        """Перенос изменений этого запроса на свежую строку из базы"""
+        merged = self.decode(row['session_data'])
+        for key in removed:
+            merged.pop(key, None)
+        merged.update(changed)
+        self._session_cache = merged
+        self._stored_version = row['version']
+        return merged
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+        session_cache.delete(session_key)
+        db.execute_update("DELETE FROM web_sessions WHERE session_key = %s", (session_key,))
+
+    @classmethod
+    def clear_expired(cls, batch_size=5000):
+        """Удаление просроченных сессий пачками, чтобы не держать долгих блокировок"""
+        total = 0
+        while True:
+            deleted = db.execute_update("""
+                DELETE FROM web_sessions
+                WHERE session_key IN (
+                    SELECT session_key FROM web_sessions
+                    WHERE expire_date < NOW()
+                    LIMIT %s
+                )
+            """, (batch_size,))
+            total += deleted
+            if deleted < batch_size:
+                return total
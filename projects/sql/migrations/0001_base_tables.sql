@@ -0,0 +1,66 @@
+-- Основные таблицы приложения. На базах, где таблицы уже созданы вручную,
+-- миграция ничего не меняет (IF NOT EXISTS).
+
+CREATE TABLE IF NOT EXISTS users (
+    id SERIAL PRIMARY KEY,
+    username VARCHAR(150) NOT NULL,
+    password VARCHAR(128) NOT NULL,
+    email VARCHAR(254),
+    first_name VARCHAR(150) NOT NULL DEFAULT '',
+    last_name VARCHAR(150) NOT NULL DEFAULT '',
+    avatar VARCHAR(255),
+    telegram VARCHAR(100),
+    age INTEGER,
+    bio TEXT,
+    city VARCHAR(100),
+    crypto_wallet VARCHAR(255),
+    is_active BOOLEAN NOT NULL DEFAULT TRUE,
+    is_staff BOOLEAN NOT NULL DEFAULT FALSE,
+    is_superuser BOOLEAN NOT NULL DEFAULT FALSE,
+    date_joined TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    last_login TIMESTAMPTZ
+);
+
+CREATE TABLE IF NOT EXISTS categories (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    slug VARCHAR(100) NOT NULL UNIQUE,
+    icon VARCHAR(50)
+);
+
+CREATE TABLE IF NOT EXISTS projects (
+    id SERIAL PRIMARY KEY,
+    owner_id INTEGER NOT NULL REFERENCES users (id),
+    title VARCHAR(255) NOT NULL,
+    slogan VARCHAR(255) DEFAULT '',
+    description TEXT NOT NULL,
+    category_id INTEGER NOT NULL REFERENCES categories (id),
+    target_amount NUMERIC(14, 2) NOT NULL,
+    collected_amount NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    image VARCHAR(255),
+    deadline TIMESTAMPTZ NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'draft',
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS donations (
+    id SERIAL PRIMARY KEY,
+    project_id INTEGER NOT NULL REFERENCES projects (id) ON DELETE CASCADE,
+    donor_id INTEGER REFERENCES users (id),
+    amount NUMERIC(24, 8) NOT NULL,
+    amount_usdt_equivalent NUMERIC(14, 2) NOT NULL,
+    currency VARCHAR(20) NOT NULL,
+    email_receipt VARCHAR(254) DEFAULT '',
+    bitpay_invoice_id VARCHAR(100),
+    bitpay_status VARCHAR(30) NOT NULL DEFAULT 'pending',
+    is_anonymous BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Категории, на которые рассчитаны фильтры каталога
+INSERT INTO categories (name, slug) VALUES
+    ('Социальные', 'social'),
+    ('Экология', 'eco'),
+    ('Образование', 'edu'),
+    ('Искусство', 'art')
+ON CONFLICT (slug) DO NOTHING;
@@ -0,0 +1,12 @@
+-- Сессии Django (SESSION_ENGINE = 'projects.session_store').
+-- UNLOGGED: запись не идёт в WAL, после аварийного перезапуска таблица очищается.
+
+CREATE UNLOGGED TABLE IF NOT EXISTS web_sessions (
+    session_key VARCHAR(40) PRIMARY KEY,
+    session_data TEXT NOT NULL,
+    expire_date TIMESTAMPTZ NOT NULL,
+    -- Растёт при каждой записи: сохранение из устаревшей копии не затирает чужие изменения
+    version INTEGER NOT NULL DEFAULT 1
+);
+
+CREATE INDEX IF NOT EXISTS web_sessions_expire_date_idx ON web_sessions (expire_date);
@@ -0,0 +1,180 @@
+-- Денормализованная модель чтения для карточек проектов (index, projects_list).
+-- Содержит ровно то, что нужно карточке, и поддерживается триггерами при
+-- изменении проектов (включая collected_amount после пожертвований),
+-- владельцев и категорий. Скрипт идемпотентен.
+
+CREATE TABLE IF NOT EXISTS project_cards (
+    id INTEGER PRIMARY KEY REFERENCES projects (id) ON DELETE CASCADE,
+    owner_id INTEGER NOT NULL,
+    owner_username TEXT,
+    owner_avatar TEXT,
+    category_id INTEGER NOT NULL,
+    category_name TEXT,
+    category_slug TEXT,
+    category_icon TEXT,
+    title TEXT NOT NULL,
+    slogan TEXT,
+    image TEXT,
+    status TEXT NOT NULL,
+    target_amount NUMERIC NOT NULL,
+    collected_amount NUMERIC NOT NULL,
+    deadline TIMESTAMPTZ NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL,
+    -- Версия строки: меняется при каждой пересборке карточки (используется кэшем фрагментов)
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp()
+);
+
+CREATE INDEX IF NOT EXISTS project_cards_status_created_idx
+    ON project_cards (status, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS project_cards_created_idx
+    ON project_cards (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS project_cards_owner_idx ON project_cards (owner_id);
+-- Фильтрация по категории (с фильтром по статусу и без) с keyset-пагинацией
+CREATE INDEX IF NOT EXISTS project_cards_status_category_created_idx
+    ON project_cards (status, category_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS project_cards_category_created_idx
+    ON project_cards (category_id, created_at DESC, id DESC);
+
+-- Счётчики карточек по (статус, категория) для фасетов фильтра.
+-- Меняются только при появлении/удалении карточки или смене её статуса
+-- либо категории — обновления суммы после пожертвований их не затрагивают.
+CREATE TABLE IF NOT EXISTS project_card_counts (
+    status TEXT NOT NULL,
+    category_id INTEGER NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (status, category_id)
+);
+
+-- Пересборка карточки одного проекта (черновики в модель не попадают)
+CREATE OR REPLACE FUNCTION project_cards_refresh(p_id INTEGER) RETURNS VOID AS $$
+BEGIN
+    INSERT INTO project_cards (
+        id, owner_id, owner_username, owner_avatar,
+        category_id, category_name, category_slug, category_icon,
+        title, slogan, image, status, target_amount, collected_amount, deadline, created_at,
+        updated_at
+    )
+    SELECT
+        p.id, p.owner_id, u.username, u.avatar,
+        p.category_id, c.name, c.slug, c.icon,
+        p.title, p.slogan, p.image, p.status, p.target_amount, p.collected_amount, p.deadline, p.created_at,
+        clock_timestamp()
+    FROM projects p
+    JOIN users u ON p.owner_id = u.id
+    JOIN categories c ON p.category_id = c.id
+    WHERE p.id = p_id AND p.status <> 'draft'
+    ON CONFLICT (id) DO UPDATE SET
+        owner_id = EXCLUDED.owner_id,
+        owner_username = EXCLUDED.owner_username,
+        owner_avatar = EXCLUDED.owner_avatar,
+        category_id = EXCLUDED.category_id,
+        category_name = EXCLUDED.category_name,
+        category_slug = EXCLUDED.category_slug,
+        category_icon = EXCLUDED.category_icon,
+        title = EXCLUDED.title,
+        slogan = EXCLUDED.slogan,
+        image = EXCLUDED.image,
+        status = EXCLUDED.status,
+        target_amount = EXCLUDED.target_amount,
+        collected_amount = EXCLUDED.collected_amount,
+        deadline = EXCLUDED.deadline,
+        created_at = EXCLUDED.created_at,
+        updated_at = EXCLUDED.updated_at;
+
+    IF NOT FOUND THEN
+        DELETE FROM project_cards WHERE id = p_id;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION project_card_counts_on_card() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE project_card_counts SET count = count - 1
+        WHERE status = OLD.status AND category_id = OLD.category_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO project_card_counts (status, category_id, count)
+        VALUES (NEW.status, NEW.category_id, 1)
+        ON CONFLICT (status, category_id) DO UPDATE SET count = project_card_counts.count + 1;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION project_cards_on_project() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM project_cards_refresh(NEW.id);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION project_cards_on_owner() RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE project_cards
+    SET owner_username = NEW.username, owner_avatar = NEW.avatar, updated_at = clock_timestamp()
+    WHERE owner_id = NEW.id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION project_cards_on_category() RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE project_cards
+    SET category_name = NEW.name, category_slug = NEW.slug, category_icon = NEW.icon,
+        updated_at = clock_timestamp()
+    WHERE category_id = NEW.id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS project_cards_project_trg ON projects;
+CREATE TRIGGER project_cards_project_trg
+    AFTER INSERT OR UPDATE ON projects
+    FOR EACH ROW EXECUTE FUNCTION project_cards_on_project();
+
+DROP TRIGGER IF EXISTS project_cards_owner_trg ON users;
+CREATE TRIGGER project_cards_owner_trg
+    AFTER UPDATE OF username, avatar ON users
+    FOR EACH ROW
+    WHEN (OLD.username IS DISTINCT FROM NEW.username OR OLD.avatar IS DISTINCT FROM NEW.avatar)
+    EXECUTE FUNCTION project_cards_on_owner();
+
+DROP TRIGGER IF EXISTS project_cards_category_trg ON categories;
+CREATE TRIGGER project_cards_category_trg
+    AFTER UPDATE ON categories
+    FOR EACH ROW EXECUTE FUNCTION project_cards_on_category();
+
+DROP TRIGGER IF EXISTS project_card_counts_insert_delete_trg ON project_cards;
+CREATE TRIGGER project_card_counts_insert_delete_trg
+    AFTER INSERT OR DELETE ON project_cards
+    FOR EACH ROW EXECUTE FUNCTION project_card_counts_on_card();
+
+DROP TRIGGER IF EXISTS project_card_counts_update_trg ON project_cards;
+CREATE TRIGGER project_card_counts_update_trg
+    AFTER UPDATE OF status, category_id ON project_cards
+    FOR EACH ROW
+    WHEN (OLD.status IS DISTINCT FROM NEW.status OR OLD.category_id IS DISTINCT FROM NEW.category_id)
+    EXECUTE FUNCTION project_card_counts_on_card();
+
+-- Первичное заполнение карточек из существующих проектов (при повторном
+-- запуске карточки уже есть и не трогаются); счётчики ведёт триггер
+INSERT INTO project_cards (
+    id, owner_id, owner_username, owner_avatar,
+    category_id, category_name, category_slug, category_icon,
+    title, slogan, image, status, target_amount, collected_amount, deadline, created_at
+)
+SELECT
+    p.id, p.owner_id, u.username, u.avatar,
+    p.category_id, c.name, c.slug, c.icon,
+    p.title, p.slogan, p.image, p.status, p.target_amount, p.collected_amount, p.deadline, p.created_at
+FROM projects p
+JOIN users u ON p.owner_id = u.id
+JOIN categories c ON p.category_id = c.id
+WHERE p.status <> 'draft'
+ON CONFLICT (id) DO NOTHING;
+
+-- Первичное заполнение счётчиков (при повторном запуске их уже ведут триггеры)
+INSERT INTO project_card_counts (status, category_id, count)
+SELECT status, category_id, COUNT(*) FROM project_cards GROUP BY status, category_id
+ON CONFLICT (status, category_id) DO NOTHING;
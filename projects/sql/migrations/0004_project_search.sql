@@ -0,0 +1,17 @@
+-- Полнотекстовый поиск по проектам.
+-- search_vector — вычисляемый столбец (PostgreSQL 12+): пересчитывается самой
+-- базой при каждом INSERT/UPDATE, поэтому отдельные триггеры не нужны.
+-- Текст индексируется в русской и английской конфигурациях; веса:
+-- title — A, slogan — B, description — C. Скрипт идемпотентен.
+-- Добавление STORED-столбца переписывает таблицу projects под блокировкой
+-- ACCESS EXCLUSIVE. GIN-индекс строится отдельно, CONCURRENTLY (0007).
+
+ALTER TABLE projects ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(slogan, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(slogan, '')), 'B') ||
+        setweight(to_tsvector('russian', coalesce(description, '')), 'C') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'C')
+    ) STORED;
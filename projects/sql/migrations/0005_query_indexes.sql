@@ -0,0 +1,32 @@
+-- migrate: no-transaction
+-- Индексы под предикаты и сортировки запросов models_sql.py.
+-- Строятся CONCURRENTLY, не блокируя запись в рабочие таблицы, поэтому
+-- миграция выполняется вне транзакции, по одной команде.
+
+-- User.get_by_username / get_by_email / authenticate: ... AND is_active = TRUE
+CREATE INDEX CONCURRENTLY IF NOT EXISTS users_username_active_idx
+    ON users (username) WHERE is_active = TRUE;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS users_email_active_idx
+    ON users (email) WHERE is_active = TRUE;
+
+-- Пожертвования проекта: WHERE project_id = %s ORDER BY created_at DESC, id DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS donations_project_created_idx
+    ON donations (project_id, created_at DESC, id DESC);
+
+-- Пожертвования донора (только неанонимные): WHERE donor_id = %s AND is_anonymous = FALSE
+CREATE INDEX CONCURRENTLY IF NOT EXISTS donations_donor_created_idx
+    ON donations (donor_id, created_at DESC, id DESC) WHERE is_anonymous = FALSE;
+
+-- Вебхук BitPay: поиск по номеру счёта (у большинства строк его нет)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS donations_bitpay_invoice_idx
+    ON donations (bitpay_invoice_id) WHERE bitpay_invoice_id IS NOT NULL;
+
+-- Project.get_by_owner: WHERE owner_id = %s [AND status = %s] ORDER BY created_at DESC
+-- (status в INCLUDE — фильтр по статусу проверяется прямо по индексу)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS projects_owner_created_idx
+    ON projects (owner_id, created_at DESC) INCLUDE (status);
+
+-- ANALYZE не выполняется CONCURRENTLY, но и не блокирует запись
+ANALYZE users;
+ANALYZE projects;
+ANALYZE donations;
@@ -0,0 +1,25 @@
+-- Очередь фоновых задач (projects/jobs.py, manage.py run_jobs).
+-- Выполненные задачи удаляются; исчерпавшие попытки остаются со статусом
+-- 'dead' и текстом последней ошибки.
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id BIGSERIAL PRIMARY KEY,
+    task VARCHAR(100) NOT NULL,
+    payload JSONB NOT NULL DEFAULT '{}',
+    -- Задачи с одинаковым ключом, ещё ждущие выполнения, не дублируются
+    key VARCHAR(200),
+    status VARCHAR(10) NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'dead')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    run_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    locked_at TIMESTAMPTZ,
+    locked_by TEXT,
+    last_error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Выборка следующей задачи: только ждущие, по времени запуска
+CREATE INDEX IF NOT EXISTS jobs_queued_run_at_idx ON jobs (run_at, id) WHERE status = 'queued';
+-- Поиск зависших задач упавших воркеров
+CREATE INDEX IF NOT EXISTS jobs_running_locked_at_idx ON jobs (locked_at) WHERE status = 'running';
+CREATE UNIQUE INDEX IF NOT EXISTS jobs_queued_key_idx ON jobs (key) WHERE status = 'queued';
@@ -0,0 +1,7 @@
+-- migrate: no-transaction
+-- GIN-индекс полнотекстового поиска по projects.search_vector (0004).
+-- Строится CONCURRENTLY, не блокируя запись в projects, поэтому
+-- миграция выполняется вне транзакции.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS projects_search_vector_idx
+    ON projects USING GIN (search_vector);
@@ -0,0 +1,6 @@
+-- Отметка отката пожертвования (Donation.rollback_donation): сумма проекта
+-- уменьшается не больше одного раза, а bitpay_status остаётся таким, каким
+-- его сообщил BitPay. Столбец без значения по умолчанию — таблица не
+-- переписывается.
+
+ALTER TABLE donations ADD COLUMN IF NOT EXISTS rolled_back_at TIMESTAMPTZ;
@@ -0,0 +1,27 @@
+# projects/tasks.py
+#
+# Обработчики фоновых задач (projects/jobs.py). Модуль импортируется при
+# старте приложения (ProjectsConfig.ready), чтобы enqueue знал имена задач.
+# Каждый обработчик должен выдерживать повторный запуск.
+
+from .avatars import delete_avatar
+from .jobs import task
+from .models_sql import Donation, Project
+
+
+@task('avatars.delete')
+def delete_avatar_files(url, active_only=False):
+    """Удаление файлов прежнего аватара, если он ни у кого не записан; повторно — ничего не происходит"""
+    delete_avatar(url, active_only=active_only)
+
+
+@task('projects.update_status')
+def update_project_status(project_id):
+    """Пересчёт статуса проекта по текущим суммам и дедлайну"""
+    Project.update_status(project_id)
+
+
+@task('donations.rollback')
+def rollback_donation(donation_id):
+    """Откат неоплаченного пожертвования; уже откаченное повторно не трогается"""
+    Donation.rollback_donation(donation_id)
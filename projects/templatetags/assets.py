@@ -0,0 +1,94 @@
+# projects/templatetags/assets.py
+
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+from projects.assets import (
+    BUNDLES, FONT_FACES, FONT_FAMILY, SITE_CSS, SITE_JS, critical_css, manifest, variant_name,
+)
+
+register = template.Library()
+
+
+@register.simple_tag
+def picture(name, alt='', sizes='100vw', css_class='', loading=''):
+    """<picture> с WebP и JPEG/PNG всех ширин из manage.py build_static
+
+    {% picture 'Image/art.png' alt=project.title sizes="(max-width: 768px) 100vw, 50vw" %}
+    Пока сборки не было — обычный <img> с исходным файлом.
+    """
+    info = manifest()['images'].get(name)
+    extra = format_html_join('', ' {}="{}"', ((k, v) for k, v in (('class', css_class), ('loading', loading)) if v))
+    if not info:
+        return format_html('<img src="{}" alt="{}"{}>', static(name), alt, extra)
+
+    srcset = {
+        ext: ', '.join(f'{static(variant_name(name, width, ext))} {width}w' for width in info['widths'])
+        for ext in ('webp', info['fallback'])
+    }
+    largest = variant_name(name, info['widths'][-1], info['fallback'])
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}"{} decoding="async"></picture>',
+        srcset['webp'], sizes, static(largest), srcset[info['fallback']], sizes, alt, extra
+    )
+
+
+@register.simple_tag
+def font_faces():
+    """@font-face для FONT_FACES: WOFF2 из сборки, исходный OTF — запасной
+
+    WOFF2 обычного начертания подгружается заранее (preload).
+    """
+    fonts = manifest()['fonts']
+    rules = []
+    for weight, name in FONT_FACES.items():
+        sources = [format_html('url("{}") format("opentype")', static(name))]
+        if str(weight) in fonts:
+            sources.insert(0, format_html('url("{}") format("woff2")', static(fonts[str(weight)])))
+        rules.append(format_html(
+            "@font-face {{ font-family: '{}'; src: {}; font-weight: {}; font-style: normal; font-display: swap; }}",
+            FONT_FAMILY, mark_safe(', '.join(sources)), weight
+        ))
+
+    preload = ''
+    regular = fonts.get('400')
+    if regular:
+        preload = format_html(
+            '<link rel="preload" href="{}" as="font" type="font/woff2" crossorigin>\n    ', static(regular)
+        )
+    return format_html('{}<style>\n{}\n    </style>', preload, format_html_join('\n', '        {}', ((r,) for r in rules)))
+
+
+@register.simple_tag
+def stylesheets(critical=False):
+    """CSS сайта обычным <link>
+
+    critical=True — только для шаблонов из CRITICAL_TEMPLATES: критические
+    правила встроены, бандл грузится без блокировки отрисовки. На остальных
+    страницах их первый экран в critical.css не попадает.
+    Пока сборки не было — исходные файлы обычными <link>.
+    """
+    if SITE_CSS not in manifest()['bundles']:
+        return format_html_join('\n    ', '<link rel="stylesheet" href="{}">', ((static(n),) for n in BUNDLES[SITE_CSS]))
+    url = static(SITE_CSS)
+    if not critical:
+        return format_html('<link rel="stylesheet" href="{}">', url)
+    return format_html(
+        '<style>{}</style>\n    '
+        '<link rel="preload" href="{}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">\n    '
+        '<noscript><link rel="stylesheet" href="{}"></noscript>',
+        mark_safe(critical_css()), url, url
+    )
+
+
+@register.simple_tag
+def scripts():
+    """JS сайта с defer: выполняется после разбора страницы и не блокирует её"""
+    if SITE_JS in manifest()['bundles']:
+        names = [SITE_JS]
+    else:
+        names = BUNDLES[SITE_JS]
+    return format_html_join('\n    ', '<script src="{}" defer></script>', ((static(n),) for n in names))
@@ -0,0 +1,40 @@
+# projects/templatetags/avatars.py
+
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+from projects.avatars import avatar_url as _avatar_url, is_processed
+
+register = template.Library()
+
+DEFAULT_AVATAR = 'Image/avatar.png'
+
+
+@register.filter
+def avatar_url(url, size=128):
+    """URL JPEG-копии аватара нужного размера: {{ user.avatar|avatar_url:256 }}"""
+    return _avatar_url(url, int(size)) if url else static(DEFAULT_AVATAR)
+
+
+@register.simple_tag
+def avatar(url, size=128, alt='Аватар', css_class=''):
+    """<picture> с WebP и JPEG размера size и вдвое большего для экранов 2x
+
+    Прежние (необработанные) и статические аватары — обычный <img>.
+    """
+    if not url:
+        return format_html('<img src="{}" alt="{}" class="{}">', static(DEFAULT_AVATAR), alt, css_class)
+    if not is_processed(url):
+        return format_html('<img src="{}" alt="{}" class="{}" loading="lazy">', url, alt, css_class)
+
+    srcset = {
+        ext: f'{_avatar_url(url, size, ext)} 1x, {_avatar_url(url, size * 2, ext)} 2x'
+        for ext in ('webp', 'jpg')
+    }
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}">'
+        '<img src="{}" srcset="{}" width="{}" height="{}" alt="{}" class="{}" loading="lazy" decoding="async">'
+        '</picture>',
+        srcset['webp'], _avatar_url(url, size), srcset['jpg'], size, size, alt, css_class
+    )
@@ -0,0 +1,48 @@
+# projects/templatetags/project_cards.py
+
+import os
+
+from django import template
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from projects.cache import LRUCache
+
+register = template.Library()
+
+# Отрендеренные карточки: (вариант, id проекта, версия строки, дни до дедлайна) -> HTML.
+# Новая версия строки даёт новый ключ, старый вытесняется по LRU.
+card_cache = LRUCache(maxsize=int(os.getenv('CARD_CACHE_SIZE', '2000')))
+
+CARD_TEMPLATES = {
+    'full': 'partials/project_card.html',
+    'compact': 'partials/project_card_compact.html',
+}
+
+
+def _card_version(project):
+    """Версия карточки: updated_at из project_cards или, если его нет, все поля строки"""
+    if project.get('updated_at'):
+        return project['updated_at']
+    return tuple(sorted(project.items()))
+
+
+def _progress(project):
+    target = project.get('target_amount') or 0
+    if not target:
+        return 0
+    return min(100, int(project['collected_amount'] * 100 / target))
+
+
+@register.simple_tag
+def project_card(project, variant='full'):
+    """Карточка проекта из кэша фрагментов; перерисовывается только изменившаяся"""
+    key = (variant, project['id'], _card_version(project), project.get('days_left'))
+    html = card_cache.get(key)
+    if html is None:
+        html = get_template(CARD_TEMPLATES[variant]).render({
+            'project': project,
+            'progress': _progress(project),
+        })
+        card_cache.set(key, html)
+    return mark_safe(html)
@@ -14,6 +14,7 @@ urlpatterns = [
     path('', views_sql.index, name='index'),
     path('about/', views_sql.about, name='about'),
     path('projects/', views_sql.projects_list, name='projects_list'),
+    path('projects/search/', views_sql.project_search, name='project_search'),
     path('projects/<int:project_id>/', views_sql.project_detail, name='project_detail'),
     
     # Авторизация - страницы
@@ -1,24 +1,33 @@
 # projects/views_sql.py
 
-from django.shortcuts import render, redirect
+from django.shortcuts import redirect
 from django.contrib import messages
 from django.views.decorators.csrf import csrf_exempt
 from django.http import JsonResponse, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import urlencode
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
+from asgiref.sync import sync_to_async
 import json
 import jwt
 import datetime
-import os  # ← КРИТИЧЕСКИ ВАЖНО: добавлен импорт os
 from decimal import Decimal
-from django.conf import settings  # ← Уже есть, но убедимся
-from django.core.files.storage import default_storage  # ← ДОБАВЛЕНО
-from .models_sql import User, Project, Category, Donation
+from .models_sql import User, Project, Category, Donation, PasswordHasherBusy
+from .avatars import avatar_url, save_avatar
 from .database import db
+from .jobs import enqueue
+from .metrics import WEBHOOK_SECONDS
+from .middleware import aget_current_user, get_current_user, reset_current_user
+from .profiling import render
 import base64
+import hashlib
 import logging
+import time
+
+logger = logging.getLogger(__name__)
 
 # Настройки JWT
 JWT_SECRET_KEY = 'change-this-in-production'
@@ -49,7 +58,7 @@ def verify_jwt_token(token):
 def get_user_data(request):
     """Получение данных пользователя для шаблонов"""
     if request.session.get('user_id'):
-        user = User.get_by_id(request.session['user_id'])
+        user = get_current_user(request)
         if user:
             return {
                 'id': user['id'],
@@ -57,45 +66,309 @@ def get_user_data(request):
                 'email': user['email'],
                 'first_name': user['first_name'],
                 'last_name': user['last_name'],
-                'avatar': user['avatar'] if user['avatar'] else '/static/Image/default-avatar.png',
+                # Иконка в шапке (main.js) — 32px: хватает копии 64px для экранов 2x
+                'avatar': avatar_url(user['avatar'], 64) if user['avatar'] else '/static/Image/default-avatar.png',
                 'telegram': user['telegram'],
                 'city': user['city'],
             }
     return None
 
-# Базовые страницы
-def index(request):
-    print(f"DEBUG: session keys = {request.session.keys()}")
-    print(f"DEBUG: session user_id = {request.session.get('user_id')}")
-    print(f"DEBUG: session username = {request.session.get('username')}")
+# Условный GET: ETag
+def page_validators(request, *parts):
+    """ETag страницы
+
+    ETag строится из версии данных страницы (parts) и пользователя сессии:
+    шапка страницы зависит от имени и аватара. Last-Modified не отдаётся:
+    время изменения карточек не отражает ни смену состава страницы, ни
+    фасеты, ни days_left, ни пользователя, и по If-Modified-Since клиент
+    получал бы устаревший 304.
+    """
+    user = get_current_user(request) if request.session.get('user_id') else None
+    user_part = (user['id'], user['username'], user['avatar']) if user else None
+    digest = hashlib.sha1(repr((parts, user_part)).encode('utf-8')).hexdigest()
+    return f'"{digest}"'
+
+def not_modified(request, etag):
+    """Ответ 304, если у клиента актуальная версия страницы, иначе None"""
+    # Непоказанные flash-сообщения должны попасть на страницу — отдаём её целиком
+    if request.method not in ('GET', 'HEAD') or len(messages.get_messages(request)):
+        return None
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        set_validators(response, etag)
+    return response
+
+def set_validators(response, etag):
+    """Заголовок ETag; private, no-cache — страница персональная и всегда перепроверяется"""
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+def card_json(card):
+    """Карточка проекта для JSON API"""
+    return {
+        'id': card['id'],
+        'title': card['title'],
+        'slogan': card['slogan'],
+        'image': card['image'],
+        'status': card['status'],
+        'category_slug': card['category_slug'],
+        'owner_username': card['owner_username'],
+        'target_amount': float(card['target_amount']),
+        'collected_amount': float(card['collected_amount']),
+        'days_left': card['days_left'],
+    }
+
+def cards_version(cards):
+    """Версия списка карточек: id, updated_at и days_left каждой"""
+    return tuple((c['id'], c['updated_at'], c['days_left']) for c in cards)
+
+# Базовые страницы.
+# index, projects_list, project_detail и GET api_profile — async-view: под ASGI
+# они не занимают поток, пока ждут базу. Сессию и пользователя нужно загрузить
+# через aget_current_user до первого обращения к request.session.
+async def index(request):
+    await aget_current_user(request)
+    logger.debug("Главная страница", extra={'user_id': request.session.get('user_id')})
 
-    projects = Project.get_all(status='active', limit=12)
+    projects, _ = await Project.aget_cards(status='active', limit=12)
+    etag = page_validators(request, 'index', cards_version(projects))
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    
     user_data = get_user_data(request)
-    return render(request, 'index.html', {'projects': projects, 'user': user_data})
+    response = render(request, 'index.html', {'projects': projects, 'user': user_data})
+    return set_validators(response, etag)
 
 def about(request):
     user_data = get_user_data(request)
     return render(request, 'about.html', {'user': user_data})
 
-def projects_list(request):
-    status = request.GET.get('status', 'active')
-    valid_statuses = ['active', 'success', 'expired']
-    if status not in valid_statuses:
+STATUS_FILTERS = [
+    ('all', 'Все'),
+    ('active', 'Активные'),
+    ('success', 'Успешные'),
+    ('expired', 'Просроченные'),
+]
+
+def _list_filters(params):
+    """Разбор фильтров каталога: (статус, слаги категорий, ID категорий)
+
+    Категории передаются повторяющимся параметром или через запятую:
+    ?category=eco&category=art или ?category=eco,art. Неизвестные слаги
+    отбрасываются. Статус 'all' — без фильтра по статусу (None).
+    """
+    status = params.get('status', 'active')
+    if status not in dict(STATUS_FILTERS):
         status = 'active'
     
-    projects = Project.get_all(status=status, limit=24)
+    slugs, category_ids = [], []
+    for value in params.getlist('category'):
+        for slug in value.split(','):
+            category = Category.get_by_slug(slug.strip())
+            if category and category['slug'] not in slugs:
+                slugs.append(category['slug'])
+                category_ids.append(category['id'])
+    
+    return (None if status == 'all' else status), slugs, category_ids
+
+def _filter_query(status, slugs):
+    """Строка запроса каталога с заданными фильтрами"""
+    return urlencode([('status', status or 'all')] + [('category', slug) for slug in slugs])
+
+def _load_catalog(params, limit=24):
+    """Страница карточек каталога и фасеты для текущих фильтров"""
+    status, slugs, category_ids = _list_filters(params)
+    after = params.get('after') or None
+    try:
+        projects, next_cursor = Project.get_cards(
+            status=status, limit=limit, after=after, category_ids=category_ids
+        )
+    except ValueError:
+        # Битый токен — показываем первую страницу
+        after = None
+        projects, next_cursor = Project.get_cards(status=status, limit=limit, category_ids=category_ids)
+    facets = Project.get_facets(status=status, category_ids=category_ids)
+    return _catalog(status, slugs, after, projects, next_cursor, facets)
+
+async def _aload_catalog(params, limit=24):
+    """Асинхронный вариант _load_catalog"""
+    await Category.aensure_loaded()
+    status, slugs, category_ids = _list_filters(params)
+    after = params.get('after') or None
+    try:
+        projects, next_cursor = await Project.aget_cards(
+            status=status, limit=limit, after=after, category_ids=category_ids
+        )
+    except ValueError:
+        after = None
+        projects, next_cursor = await Project.aget_cards(status=status, limit=limit, category_ids=category_ids)
+    facets = await Project.aget_facets(status=status, category_ids=category_ids)
+    return _catalog(status, slugs, after, projects, next_cursor, facets)
+
+def _catalog(status, slugs, after, projects, next_cursor, facets):
+    return {
+        'status': status,
+        'slugs': slugs,
+        'after': after,
+        'projects': projects,
+        'next_cursor': next_cursor,
+        'facets': facets,
+    }
+
+async def projects_list(request):
+    await aget_current_user(request)
+    catalog = await _aload_catalog(request.GET)
+    status, slugs = catalog['status'], catalog['slugs']
+    projects, facets = catalog['projects'], catalog['facets']
+    
+    etag = page_validators(
+        request, 'projects', status, slugs, catalog['after'], catalog['next_cursor'],
+        cards_version(projects), repr(facets)
+    )
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    
+    # Ссылки чипов: статус заменяется, категория включается/выключается
+    status_chips = [{
+        'label': label,
+        'count': facets['statuses'].get(value, 0),
+        'active': (status or 'all') == value,
+        'query': _filter_query(None if value == 'all' else value, slugs),
+    } for value, label in STATUS_FILTERS]
+    category_chips = [dict(
+        category,
+        query=_filter_query(status, [s for s in slugs if s != category['slug']]
+                            if category['selected'] else slugs + [category['slug']]),
+    ) for category in facets['categories']]
+    
     user_data = get_user_data(request)
-    return render(request, 'projects.html', {'projects': projects, 'current_status': status, 'user': user_data})
+    response = render(request, 'projects.html', {
+        'projects': projects,
+        'current_status': status or 'all',
+        'status_chips': status_chips,
+        'category_chips': category_chips,
+        'all_categories_query': _filter_query(status, []),
+        'filter_query': _filter_query(status, slugs),
+        'is_first_page': catalog['after'] is None,
+        'next_cursor': catalog['next_cursor'],
+        'user': user_data
+    })
+    return set_validators(response, etag)
 
-def project_detail(request, project_id):
-    project = Project.get_by_id(project_id)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def api_projects(request):
+    """
+    Каталог проектов с фильтрами и фасетами: ?status=...&category=...&after=...
+    """
+    catalog = _load_catalog(request.query_params)
+    return Response({
+        'results': [card_json(p) for p in catalog['projects']],
+        'next_cursor': catalog['next_cursor'],
+        'facets': {
+            'status': catalog['facets']['statuses'],
+            'category': [
+                {'slug': c['slug'], 'name': c['name'], 'count': c['count'], 'selected': c['selected']}
+                for c in catalog['facets']['categories']
+            ],
+        },
+    })
+
+SEARCH_PAGE_SIZE = 24
+SEARCH_MAX_PAGE = 20
+
+def _search_params(params):
+    """Разбор параметров поиска: (строка, статус, номер страницы)"""
+    query = (params.get('q') or '').strip()
+    search_status = params.get('status')
+    if search_status not in ('active', 'success', 'expired'):
+        search_status = None
+    try:
+        page = min(max(int(params.get('page', 1)), 1), SEARCH_MAX_PAGE)
+    except (TypeError, ValueError):
+        page = 1
+    return query, search_status, page
+
+def project_search(request):
+    query, search_status, page = _search_params(request.GET)
+    projects, has_more = Project.search(
+        query, status=search_status,
+        limit=SEARCH_PAGE_SIZE, offset=(page - 1) * SEARCH_PAGE_SIZE
+    )
+    
+    user_data = get_user_data(request)
+    return render(request, 'projects.html', {
+        'projects': projects,
+        'search_query': query,
+        'current_status': search_status or '',
+        'search_page': page,
+        'search_prev_page': page - 1 if page > 1 else None,
+        'search_next_page': page + 1 if has_more and page < SEARCH_MAX_PAGE else None,
+        'user': user_data
+    })
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def api_project_search(request):
+    """
+    Полнотекстовый поиск проектов: ?q=...&status=...&page=...
+    """
+    query, search_status, page = _search_params(request.query_params)
+    if not query:
+        return Response(
+            {'detail': 'Укажите строку поиска (q)'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    projects, has_more = Project.search(
+        query, status=search_status,
+        limit=SEARCH_PAGE_SIZE, offset=(page - 1) * SEARCH_PAGE_SIZE
+    )
+    return Response({
+        'results': [dict(card_json(p), rank=p['rank']) for p in projects],
+        'page': page,
+        'next_page': page + 1 if has_more and page < SEARCH_MAX_PAGE else None,
+    })
+
+async def project_detail(request, project_id):
+    await aget_current_user(request)
+    donations_after = request.GET.get('donations_after') or None
+    
+    try:
+        donations, donations_next_cursor = await Donation.aget_page_by_project(
+            project_id, limit=20, after=donations_after
+        )
+    except ValueError:
+        donations, donations_next_cursor = await Donation.aget_page_by_project(project_id, limit=20)
+    
+    # Дешёвая проверка версии до основных запросов (черновики проверяются всегда полностью).
+    # Строки показанных пожертвований входят в ETag: имя и аватар донора
+    # берутся из users, и их смена не меняет версию проекта
+    version = await Project.aget_version(project_id)
+    if version:
+        etag = page_validators(request, 'project', project_id, donations_after, version, donations)
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+    
+    project = await Project.aget_by_id(project_id)
     if not project:
         messages.error(request, 'Проект не найден')
         return redirect('projects:index')
     
-    donations = Donation.get_by_project(project_id, limit=20)
     user_data = get_user_data(request)
-    return render(request, 'project_info.html', {'project': project, 'donations': donations, 'user': user_data})
+    response = render(request, 'project_info.html', {
+        'project': project,
+        'donations': donations,
+        'donations_next_cursor': donations_next_cursor,
+        'user': user_data
+    })
+    if version:
+        set_validators(response, etag)
+    return response
 
 def register(request):
     user_data = get_user_data(request)
@@ -111,6 +384,7 @@ def forgot_password(request):
 
 def logout_view(request):
     request.session.flush()
+    reset_current_user(request)
     messages.success(request, 'Вы успешно вышли из системы')
     return redirect('projects:index')
 
@@ -120,7 +394,7 @@ def profile(request):
         return redirect('projects:login')
     
     user_id = request.session['user_id']
-    user = User.get_by_id(user_id)
+    user = get_current_user(request)
     if not user:
         request.session.flush()
         messages.error(request, 'Пользователь не найден')
@@ -151,48 +425,19 @@ def api_forgot_password(request):
         )
     
     identifier = identifier.strip()
-    print(f"🔍 Поиск пользователя: '{identifier}'")
     
     # Ищем пользователя по разным критериям
     user = None
     
     # 1. Сначала пробуем по логину (точное совпадение)
     user = User.get_by_username(identifier)
-    if user:
-        print(f"✅ Найден по логину: {user['username']}")
     
     # 2. Если не найден, пробуем по почте
     if not user:
         user = User.get_by_email(identifier)
-        if user:
-            print(f"✅ Найден по email: {user['email']}")
-    
-    # 3. Если всё ещё не найден, пробуем поиск по части логина или почты
-    if not user:
-        print(f"❌ Пользователь не найден. Проверяем базу...")
-        try:
-            # Поиск по логину (LIKE)
-            query = "SELECT id, username, email FROM users WHERE username ILIKE %s LIMIT 1"
-            result = db.execute_query(query, (identifier,))
-            if result:
-                print(f"⚠️ Найден по частичному совпадению логина: {result[0]}")
-            
-            # Поиск по почте (LIKE)
-            query = "SELECT id, username, email FROM users WHERE email ILIKE %s LIMIT 1"
-            result = db.execute_query(query, (identifier,))
-            if result:
-                print(f"⚠️ Найден по частичному совпадению email: {result[0]}")
-            
-            # Список всех пользователей для отладки
-            query = "SELECT id, username, email, is_active FROM users LIMIT 10"
-            all_users = db.execute_query(query)
-            print(f"📋 Первые 10 пользователей в базе:")
-            for u in all_users:
-                print(f"   - ID: {u['id']}, Логин: {u['username']}, Email: {u['email']}, Активен: {u['is_active']}")
-        except Exception as e:
-            print(f"⚠️ Ошибка при отладке: {e}")
     
     if not user:
+        logger.info("Сброс пароля: пользователь не найден")
         return Response(
             {'detail': 'Пользователь не найден'},
             status=status.HTTP_404_NOT_FOUND
@@ -202,7 +447,7 @@ def api_forgot_password(request):
     uid = base64.urlsafe_b64encode(str(user['id']).encode()).decode()
     token = f'reset-token-{user["id"]}'
     
-    print(f"✅ Токен сгенерирован для {user['username']} (ID: {user['id']})")
+    logger.info("Сброс пароля: токен сгенерирован", extra={'user_id': user['id']})
     
     return Response({
         'uid': uid,
@@ -285,7 +530,13 @@ def api_login(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    user = User.authenticate(username, password)
+    try:
+        user = User.authenticate(username, password)
+    except PasswordHasherBusy as e:
+        return Response(
+            {'detail': str(e)}, 
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
     
     if user:
         token = generate_jwt_token(user['id'], user['username'])
@@ -293,6 +544,7 @@ def api_login(request):
         # Сохраняем данные в сессию Django
         request.session['user_id'] = user['id']
         request.session['username'] = user['username']
+        reset_current_user(request)
         
         # Возвращаем данные для фронтенда
         return Response({
@@ -352,6 +604,11 @@ def api_register(request):
             password=password,
             email=email if email else None,
         )
+    except PasswordHasherBusy as e:
+        return Response(
+            {'detail': str(e)}, 
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
     except Exception as e:
         return Response(
             {'detail': f'Ошибка создания пользователя: {str(e)}'}, 
@@ -363,6 +620,7 @@ def api_register(request):
     # Сохраняем данные в сессию Django
     request.session['user_id'] = user['id']
     request.session['username'] = user['username']
+    reset_current_user(request)
     
     return Response({
         'user': {
@@ -377,20 +635,66 @@ def api_register(request):
         'detail': 'Регистрация успешна'
     }, status=status.HTTP_201_CREATED)
 
-@api_view(['GET', 'PATCH'])
-@permission_classes([IsAuthenticated])
-def api_profile(request):
+def _profile_user_id(request):
+    """ID пользователя запроса: из JWT (Authorization: Bearer) или из сессии"""
     auth_header = request.headers.get('Authorization', '')
-    user_id = None
     
     if auth_header.startswith('Bearer '):
         token = auth_header[7:]
         payload = verify_jwt_token(token)
-        if payload:
-            user_id = payload.get('user_id')
+        if payload and payload.get('user_id'):
+            return payload['user_id']
     
-    if not user_id and request.session.get('user_id'):
-        user_id = request.session['user_id']
+    return request.session.get('user_id')
+
+def _profile_json(user):
+    """Профиль пользователя для JSON API"""
+    return {
+        'id': user['id'],
+        'username': user['username'],
+        'email': user['email'],
+        'first_name': user['first_name'],
+        'last_name': user['last_name'],
+        'telegram': user['telegram'],
+        'age': user['age'],
+        'city': user['city'],
+        'bio': user['bio'],
+        'crypto_wallet': user['crypto_wallet'],
+        'avatar': user['avatar']
+    }
+
+async def api_profile(request):
+    """
+    Профиль пользователя: GET — асинхронно, PATCH — синхронный DRF-view api_profile_update
+    
+    DRF не поддерживает async-view, поэтому GET отвечает обычным JsonResponse
+    и авторизуется так же, как сам view: JWT или сессия.
+    """
+    if request.method == 'PATCH':
+        return await sync_to_async(api_profile_update)(request)
+    if request.method != 'GET':
+        return JsonResponse({'detail': f'Метод "{request.method}" не разрешён.'}, status=405)
+    
+    if hasattr(request.session, 'aensure_loaded'):
+        await request.session.aensure_loaded()
+    user_id = _profile_user_id(request)
+    
+    if not user_id:
+        return JsonResponse({'detail': 'Не авторизован'}, status=401)
+    
+    user = await User.aget_by_id(user_id)
+    if not user:
+        return JsonResponse({'detail': 'Пользователь не найден'}, status=404)
+    
+    return JsonResponse(_profile_json(user))
+
+# Проверку CSRF для PATCH выполняет DRF (csrf_exempt в Django 4.2 не оборачивает корутины)
+api_profile.csrf_exempt = True
+
+@api_view(['PATCH'])
+@permission_classes([IsAuthenticated])
+def api_profile_update(request):
+    user_id = _profile_user_id(request)
     
     if not user_id:
         return Response(
@@ -405,68 +709,40 @@ def api_profile(request):
             status=status.HTTP_404_NOT_FOUND
         )
     
-    if request.method == 'GET':
-        return Response({
-            'id': user['id'],
-            'username': user['username'],
-            'email': user['email'],
-            'first_name': user['first_name'],
-            'last_name': user['last_name'],
-            'telegram': user['telegram'],
-            'age': user['age'],
-            'city': user['city'],
-            'bio': user['bio'],
-            'crypto_wallet': user['crypto_wallet'],
-            'avatar': user['avatar']
-        })
+    update_data = {}
+    
+    fields_map = {
+        'email': 'email',
+        'first_name': 'first_name',
+        'last_name': 'last_name',
+        'telegram': 'telegram',
+        'age': 'age',
+        'city': 'city',
+        'bio': 'bio',
+        'crypto_wallet': 'crypto_wallet',
+        'password': 'password'
+    }
+    
+    for field, db_field in fields_map.items():
+        if field in request.data:
+            update_data[db_field] = request.data[field]
     
-    elif request.method == 'PATCH':
-        update_data = {}
-        
-        fields_map = {
-            'email': 'email',
-            'first_name': 'first_name',
-            'last_name': 'last_name',
-            'telegram': 'telegram',
-            'age': 'age',
-            'city': 'city',
-            'bio': 'bio',
-            'crypto_wallet': 'crypto_wallet',
-            'password': 'password'
-        }
-        
-        for field, db_field in fields_map.items():
-            if field in request.data:
-                update_data[db_field] = request.data[field]
+    try:
+        if update_data:
+            User.update(user_id, **update_data)
+            user = User.get_by_id(user_id)
         
-        try:
-            if update_data:
-                User.update(user_id, **update_data)
-                user = User.get_by_id(user_id)
-            
-            return Response({
-                'id': user['id'],
-                'username': user['username'],
-                'email': user['email'],
-                'first_name': user['first_name'],
-                'last_name': user['last_name'],
-                'telegram': user['telegram'],
-                'age': user['age'],
-                'city': user['city'],
-                'bio': user['bio'],
-                'crypto_wallet': user['crypto_wallet'],
-                'avatar': user['avatar']
-            })
-        except ValueError as e:
-            return Response(
-                {'detail': str(e)}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        except Exception as e:
-            return Response(
-                {'detail': f'Ошибка обновления: {str(e)}'}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        return Response(_profile_json(user))
+    except ValueError as e:
+        return Response(
+            {'detail': str(e)}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    except Exception as e:
+        return Response(
+            {'detail': f'Ошибка обновления: {str(e)}'}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
 
 # Удаление профиля
 def delete_profile(request):
@@ -478,7 +754,7 @@ def delete_profile(request):
     
     try:
         user_id = request.session['user_id']
-        user = User.get_by_id(user_id)
+        user = get_current_user(request)
         
         if not user:
             request.session.flush()
@@ -498,22 +774,19 @@ def delete_profile(request):
             Project.delete(project['id'])
         
         # 🔥 Удаляем все пожертвования пользователя
-        donations = Donation.get_by_donor(user_id)
-        for donation in donations:
-            Donation.rollback_donation(donation['id'])
-        
-        # 🔥 Удаляем аватар из файловой системы
-        if user['avatar'] and not user['avatar'].startswith('/static/'):
-            try:
-                avatar_path = os.path.join(settings.MEDIA_ROOT, user['avatar'].lstrip('/media/').lstrip('/'))
-                if os.path.exists(avatar_path):
-                    os.remove(avatar_path)
-            except Exception as e:
-                print(f"⚠️ Ошибка при удалении аватара: {e}")
+        # Читаем потоково только ID: get_by_donor ограничен 50 записями
+        donation_ids = [donation['id'] for donation in Donation.iter_by_donor(user_id)]
+        for donation_id in donation_ids:
+            Donation.rollback_donation(donation_id)
         
         # 🔥 Мягкое удаление пользователя (деактивация)
         User.delete(user_id)
         
+        # 🔥 Файлы аватара удалит воркер, если их не использует ни один активный пользователь
+        # (после деактивации, иначе воркер сочтёт аватар занятым этим же пользователем)
+        if user['avatar']:
+            enqueue('avatars.delete', {'url': user['avatar'], 'active_only': True})
+        
         # 🔥 Очищаем сессию
         request.session.flush()
         
@@ -523,8 +796,7 @@ def delete_profile(request):
         }, status=200)
         
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("Ошибка при удалении профиля")
         return JsonResponse({
             'error': f'Ошибка при удалении профиля: {str(e)}'
         }, status=500)
@@ -579,7 +851,7 @@ def edit_profile(request):
         return redirect('projects:login')
     
     user_id = request.session['user_id']
-    user = User.get_by_id(user_id)
+    user = get_current_user(request)
     if not user:
         request.session.flush()
         return redirect('projects:login')
@@ -621,33 +893,18 @@ def edit_profile(request):
                 if avatar_file.size > 5 * 1024 * 1024:  # 5 МБ
                     raise ValueError("Размер файла не должен превышать 5 МБ")
                 
-                # Разрешённые расширения
-                allowed_extensions = ['.jpg', '.jpeg', '.png', '.gif']
-                ext = os.path.splitext(avatar_file.name)[1].lower()
-                if ext not in allowed_extensions:
-                    raise ValueError("Разрешены только файлы форматов JPG, JPEG, PNG, GIF")
-                
-                # Удаляем старый аватар, если он есть
-                if user['avatar'] and user['avatar'] != '/static/image/default-avatar.png':
-                    old_avatar_path = os.path.join(settings.MEDIA_ROOT, user['avatar'].lstrip('/media/').lstrip('/'))
-                    if os.path.exists(old_avatar_path):
-                        os.remove(old_avatar_path)
-                
-                # Генерируем новое имя файла
-                timestamp = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
-                filename = f"avatar_{user_id}_{timestamp}{ext}"
-                filepath = os.path.join('avatars', filename)
-                
-                # Сохраняем файл
-                full_path = default_storage.save(filepath, avatar_file)
-                
-                # Сохраняем путь в БД (относительный путь от MEDIA_ROOT)
-                update_data['avatar'] = f'/media/{full_path}'
+                # Формат проверяет Pillow; сохраняются уменьшенные копии без метаданных
+                update_data['avatar'] = save_avatar(avatar_file)
             
             # Обновляем пользователя
             User.update(user_id, **update_data)
             
+            # Старый аватар удаляется в фоне после записи нового (при повторной загрузке той же картинки URL совпадает)
+            if update_data.get('avatar') and user['avatar'] and user['avatar'] != update_data['avatar']:
+                enqueue('avatars.delete', {'url': user['avatar']})
+            
             # Обновляем данные в сессии
+            reset_current_user(request)
             updated_user = User.get_by_id(user_id)
             request.session['username'] = updated_user['username']
             
@@ -658,8 +915,7 @@ def edit_profile(request):
             messages.error(request, f'⚠️ Ошибка валидации: {str(e)}')
         except Exception as e:
             messages.error(request, f'❌ Ошибка при сохранении: {str(e)}')
-            import traceback
-            traceback.print_exc()
+            logger.exception("Ошибка при сохранении профиля")
     
     # GET запрос - показываем форму
     telegram_for_form = user['telegram'].replace('@', '') if user['telegram'] else ''
@@ -744,6 +1000,12 @@ def donate_process(request):
 # BitPay Webhook
 @csrf_exempt
 def bitpay_webhook(request):
+    started = time.perf_counter()
+    response = _handle_bitpay_webhook(request)
+    WEBHOOK_SECONDS.observe(time.perf_counter() - started, response.status_code)
+    return response
+
+def _handle_bitpay_webhook(request):
     if request.method != 'POST':
         return HttpResponse(status=405)
     
@@ -765,15 +1027,18 @@ def bitpay_webhook(request):
         
         Donation.update_bitpay_status(donation['id'], status)
         
+        # Суммы и статус проекта пересчитывает воркер; BitPay получает ответ сразу
         if status in ('failed', 'expired', 'invalid'):
-            Donation.rollback_donation(donation['id'])
+            # Повторные вебхуки по одному пожертвованию сливаются в одну задачу
+            enqueue('donations.rollback', {'donation_id': donation['id']}, key=f"donation-rollback:{donation['id']}")
         elif status in ('confirmed', 'complete'):
-            Project.update_status(donation['project_id'])
+            project_id = donation['project_id']
+            enqueue('projects.update_status', {'project_id': project_id}, key=f'project-status:{project_id}')
         
         return HttpResponse('OK', status=200)
         
     except json.JSONDecodeError:
         return HttpResponse('Invalid JSON', status=400)
     except Exception as e:
-        print(f"❌ Ошибка вебхука BitPay: {e}")
+        logger.exception("Ошибка вебхука BitPay")
         return HttpResponse(f'Internal error: {str(e)}', status=500)
\ No newline at end of file